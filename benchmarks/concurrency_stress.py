@@ -0,0 +1,122 @@
+"""
+ReferenceDatabase Concurrency Stress Test
+=========================================
+
+Shares one ReferenceDatabase (of each backend) between a pool of threads
+that search it concurrently, while the main thread keeps adding references,
+and checks that:
+
+- every concurrent search returns what the same query returned on its own
+  (references added during the run are ignored: they match none of the
+  queries)
+- no search modifies the stored references
+
+The database is compiled from the Info/ reference sources into a temporary
+directory. Exits with status 1 on any mismatch.
+
+Usage:
+
+    python benchmarks/concurrency_stress.py [--threads 8] [--rounds 20]
+"""
+
+import argparse
+import copy
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_DIR, "compilers"))
+
+from python_reference_search_app import compile_references, open_database  # noqa: E402
+
+QUERIES = [
+    "list comprehension",
+    "dictionary",
+    "sort",
+    "string format",
+    "binary",
+    "append",
+    "split join",
+    "hexadecimal to decimal",
+]
+# Added while the searches run; shares no words with QUERIES
+FILLER = ("Zzyzx Qwv", "Qwv zzyzx qwv zzyzx", "Filler", ["qwv"])
+
+
+def build_database(backend, workdir):
+    """Compile the Info/ sources into a fresh database of the given backend."""
+    info_dir = os.path.join(REPO_DIR, "Info")
+    for name in os.listdir(info_dir):
+        if name.startswith("python_") and name.endswith(".py"):
+            shutil.copy(os.path.join(info_dir, name), workdir)
+    db = open_database(backend, os.path.join(workdir, f"reference_db.{backend}"))
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        compile_references(db)
+    finally:
+        os.chdir(cwd)
+    return db
+
+
+def stress(db, threads, rounds):
+    """Run the concurrent searches; return (searches, seconds, list of problems)."""
+    expected = {query: db.search(query) for query in QUERIES}
+    known_ids = {result.id for results in expected.values() for result in results}
+    before = {i: copy.deepcopy(dict(db.get(i))) for i in known_ids}
+
+    def search(query):
+        results = db.search(query)
+        old = [r for r in results if r.id in known_ids]
+        return query, old
+
+    jobs = [query for _ in range(rounds) for query in QUERIES]
+    problems = []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        futures = [pool.submit(search, query) for query in jobs]
+        # Writes come from this thread, the one that opened the database
+        while wait(futures, timeout=0.001).not_done:
+            with db.transaction():
+                db.add_reference(*FILLER)
+    for future in futures:
+        query, results = future.result()
+        if results != expected[query]:
+            problems.append(f"{query!r}: {results[:3]} != {expected[query][:3]}")
+    elapsed = time.perf_counter() - start
+
+    for i, record in before.items():
+        if dict(db.get(i)) != record:
+            problems.append(f"reference {i} was modified by a search")
+    return len(jobs), elapsed, problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8, help="Searching threads")
+    parser.add_argument("--rounds", type=int, default=20, help="Times each query is searched")
+    args = parser.parse_args()
+
+    failed = False
+    for backend in ("json", "sqlite"):
+        with tempfile.TemporaryDirectory() as workdir:
+            db = build_database(backend, workdir)
+            try:
+                count, elapsed, problems = stress(db, args.threads, args.rounds)
+            finally:
+                if hasattr(db, "close"):
+                    db.close()
+        status = "ok" if not problems else f"{len(problems)} mismatches"
+        print(f"{backend:>6}: {count} searches on {args.threads} threads in {elapsed:.2f}s - {status}")
+        for problem in problems[:10]:
+            print(f"        {problem}")
+        failed = failed or bool(problems)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""
+Docstring Extraction Benchmark
+==============================
+
+Compares the shared line scanner in compilers/docstring_extractor.py
+with the ad-hoc block parsers it replaced, on a large input made by repeating
+the reference source files in Info/.
+
+Usage:
+
+    python benchmarks/docstring_benchmark.py [--copies 200] [--runs 5]
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+import tracemalloc
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_DIR, "compilers"))
+
+from docstring_extractor import iter_docstrings  # noqa: E402
+
+
+def regex_blocks(path):
+    """Former compile_reference.py: read everything, then re.findall."""
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    return re.findall(r'"""(.*?)"""', content, re.DOTALL)
+
+
+def split_blocks(path):
+    """Former python_reference_search_app.py: read everything, then str.split."""
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    return [s for s in content.split('"""')[1::2] if s.strip()]
+
+
+def line_state_blocks(path):
+    """Former simple_compile.py: toggle on lines that start with triple quotes."""
+    blocks = []
+    in_section = False
+    current = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip().startswith('"""'):
+                if in_section and current:
+                    blocks.append(''.join(current))
+                in_section = not in_section
+                current = []
+            elif in_section:
+                current.append(line)
+    return blocks
+
+
+def scanner_blocks(path):
+    """Shared extractor: one streaming pass that skips comments and other strings."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [d.text for d in iter_docstrings(f.readline)]
+
+
+PARSERS = [
+    ("regex findall", regex_blocks),
+    ("str.split", split_blocks),
+    ("line state machine", line_state_blocks),
+    ("shared extractor", scanner_blocks),
+]
+
+
+def build_input(path, copies):
+    """Write the Info/ sources, repeated copies times, to path; return its size."""
+    info_dir = os.path.join(REPO_DIR, "Info")
+    sources = []
+    for name in sorted(os.listdir(info_dir)):
+        if name.endswith(".py"):
+            with open(os.path.join(info_dir, name), 'r', encoding='utf-8') as f:
+                sources.append(f.read().rstrip('\n') + '\n')
+    body = ''.join(sources)
+    with open(path, 'w', encoding='utf-8') as f:
+        for _ in range(copies):
+            f.write(body)
+    return os.path.getsize(path)
+
+
+def measure(parser, path, runs):
+    """Return (best seconds, peak traced bytes, block count) for one parser."""
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        blocks = parser(path)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    parser(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, len(blocks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--copies", type=int, default=200, help="Times the Info/ sources are repeated")
+    parser.add_argument("--runs", type=int, default=5, help="Timed runs per parser (best is reported)")
+    args = parser.parse_args()
+
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "large_reference.py")
+        size = build_input(path, args.copies)
+        print(f"Input: {size / 1e6:.1f} MB ({args.copies} copies of Info/*.py)\n")
+        print(f"  {'parser':<20} {'best':>10} {'MB/s':>8} {'peak mem':>10} {'blocks':>8}")
+        for name, func in PARSERS:
+            seconds, peak, count = measure(func, path, args.runs)
+            print(f"  {name:<20} {seconds * 1000:8.1f}ms {size / 1e6 / seconds:8.1f}"
+                  f" {peak / 1e6:8.1f}MB {count:8d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Keystroke Latency Benchmark
+===========================
+
+Types queries one character at a time into a SearchSession and reports the
+latency of every keystroke, then deletes them again to time backspacing.
+The results of each full query are checked against a fresh session.
+
+Usage:
+
+    python benchmarks/keystroke_benchmark.py [--top-n 3] [query ...]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from search import PythonReferenceSearch  # noqa: E402
+from search_session import SearchSession  # noqa: E402
+
+JSON_PATH = os.path.join(REPO_DIR, "new_reference", "python_reference.json")
+# Per-keystroke latency a live-filtering interface aims to stay under
+TARGET_MS = 10
+DEFAULT_QUERIES = [
+    "list comprehension",
+    "convert string to int",
+    "dict get default",
+    "binary to decimal",
+    "reverse a string",
+    # No section holds every word, so these use the fallback candidates
+    "how do i reverse a list",
+    "dictonary comprehesion",
+]
+
+
+def type_query(session, query):
+    """Type then delete a query; return the keystroke latencies in ms and the full query's matches."""
+    typing = []
+    for end in range(1, len(query) + 1):
+        start = time.perf_counter()
+        matches = session.update(query[:end])
+        typing.append((time.perf_counter() - start) * 1000)
+        if end == len(query):
+            final = matches
+    deleting = []
+    for end in range(len(query) - 1, 0, -1):
+        start = time.perf_counter()
+        session.update(query[:end])
+        deleting.append((time.perf_counter() - start) * 1000)
+    return typing, deleting, final
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("queries", nargs="*", default=DEFAULT_QUERIES, help="Queries to type")
+    parser.add_argument("--top-n", type=int, default=3, help="Results per keystroke")
+    args = parser.parse_args()
+
+    search_app = PythonReferenceSearch(JSON_PATH, cache_size=0)
+    if not search_app.reference:
+        return 1
+    # Import the fuzzy scorers before timing anything
+    SearchSession(search_app).update("warm up")
+
+    all_typing = []
+    mismatches = 0
+    for query in args.queries:
+        typing, deleting, final = type_query(SearchSession(search_app, args.top_n), query)
+        all_typing.extend(typing)
+        same = final == SearchSession(search_app, args.top_n).update(query)
+        mismatches += not same
+        print(f"{query!r:>28}: typing max {max(typing):6.2f} ms  median {statistics.median(typing):5.2f} ms"
+              f"  backspace max {max(deleting, default=0):5.2f} ms  {'ok' if same else 'MISMATCH'}")
+    print(f"\nAll keystrokes: max {max(all_typing):.2f} ms  median {statistics.median(all_typing):.2f} ms"
+          f"  (target < {TARGET_MS} ms)")
+    search_app.close()
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""
+Startup Benchmark
+=================
+
+Measures how long `python search.py` takes to show its first prompt, and
+lists the slowest imports of `import search` as reported by
+`python -X importtime`.
+
+Usage:
+
+    python benchmarks/startup_benchmark.py [--runs 10] [--top 15]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEARCH_SCRIPT = os.path.join(REPO_DIR, "search.py")
+PROMPT = b"Enter your search query"
+# Time to first prompt the interactive search aims to stay under
+TARGET_MS = 50
+
+
+def time_to_prompt():
+    """Start search.py and return the seconds until its first prompt is printed."""
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, SEARCH_SCRIPT],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        cwd=REPO_DIR
+    )
+    seen = b""
+    while PROMPT not in seen:
+        chunk = os.read(proc.stdout.fileno(), 4096)
+        if not chunk:
+            proc.wait()
+            raise RuntimeError("search.py exited before showing a prompt")
+        seen += chunk
+    elapsed = time.perf_counter() - start
+    proc.communicate(b"quit\n")
+    return elapsed
+
+
+def slowest_imports(top):
+    """Return the top (cumulative microseconds, module) pairs of `import search`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import search"],
+        capture_output=True,
+        text=True,
+        cwd=REPO_DIR
+    )
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        imports.append((int(cumulative), name.strip()))
+    imports.sort(reverse=True)
+    return imports[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="Number of cold starts to time")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest imports to list")
+    args = parser.parse_args()
+
+    # Make sure the index and store exist so every run measures a warm cache
+    time_to_prompt()
+    timings = [time_to_prompt() * 1000 for _ in range(args.runs)]
+    print(f"Time to first prompt over {args.runs} runs:")
+    print(f"  min {min(timings):.1f} ms  median {statistics.median(timings):.1f} ms  max {max(timings):.1f} ms"
+          f"  (target < {TARGET_MS} ms)")
+
+    print("\nSlowest imports of `import search` (cumulative):")
+    for cumulative, name in slowest_imports(args.top):
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Code Block Segmentation
+=======================
+
+Splits the text of an example into the code blocks that are shown with
+syntax highlighting. compile_reference.py stores the blocks of every
+example in the compiled reference (as "example_blocks", each entry tagged
+with a short digest of the example it was segmented from), so this only
+runs at display time for references compiled without them or edited
+since, and then at most once per distinct example.
+"""
+
+import hashlib
+import re
+from functools import lru_cache
+
+# A line is code if it is a comment, holds one of = ( [ ] :, or uses a keyword
+CODE_LINE = re.compile(r"^\s*#|[=(\[\]:]|(?:def|class|import|from|return|if|for|while) ")
+
+
+def is_code_line(line):
+    """Return whether a line of an example looks like code."""
+    return CODE_LINE.search(line) is not None
+
+
+@lru_cache(maxsize=1024)
+def _segment(text):
+    code_blocks = []
+    current_block = []
+    in_block = False
+    search = CODE_LINE.search
+
+    for line in text.split('\n'):
+        if search(line):
+            if not in_block and current_block:
+                code_blocks.append('\n'.join(current_block))
+                current_block = []
+            in_block = True
+            current_block.append(line)
+        elif in_block:
+            if line.strip():
+                current_block.append(line)
+            else:
+                if current_block:
+                    code_blocks.append('\n'.join(current_block))
+                    current_block = []
+                in_block = False
+
+    if current_block:
+        code_blocks.append('\n'.join(current_block))
+
+    # If no code blocks were found, treat the entire text as a code block
+    if not code_blocks and text.strip():
+        code_blocks = [text]
+
+    return tuple(code_blocks)
+
+
+def segment_code_blocks(text):
+    """Return the code blocks of an example's text as a list of strings.
+
+    Runs of code lines (plus the non-blank lines that follow them) form a
+    block and a blank line ends it. Text without any code line is returned
+    as a single block.
+    """
+    if not text:
+        return []
+    return list(_segment(text))
+
+
+def example_digest(example):
+    """Return the short digest that ties compiled code blocks to the text of their example."""
+    return hashlib.blake2b(example.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def compile_example_blocks(examples):
+    """Return the "example_blocks" entries stored in a compiled section for its examples."""
+    return [{"digest": example_digest(example), "blocks": segment_code_blocks(example)} for example in examples]
+
+
+def blocks_by_digest(example_blocks):
+    """Return the compiled code blocks of a section as a dictionary keyed by example digest."""
+    return {
+        entry["digest"]: entry["blocks"]
+        for entry in example_blocks or ()
+        if isinstance(entry, dict) and "digest" in entry
+    }
+
+
+def example_code_blocks(examples, known=None):
+    """Return the code blocks of each example, reusing compiled blocks that still match.
+
+    known maps example digests to compiled blocks (see blocks_by_digest);
+    examples edited or added after compiling have no entry there and are
+    segmented again.
+    """
+    known = known or {}
+    result = []
+    for example in examples:
+        blocks = known.get(example_digest(example))
+        result.append(blocks if blocks is not None else segment_code_blocks(example))
+    return result
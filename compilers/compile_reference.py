@@ -1,6 +1,20 @@
+import argparse
 import json
-import re
 import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from docstring_extractor import iter_file_docstrings
+
+# The search index and store live next to search.py at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from code_blocks import blocks_by_digest, compile_example_blocks, example_code_blocks
+from reference_index import build_index, index_path_for, save_index, source_digest
+from reference_store import StoreWriter, open_store, store_path_for
+
+# Incremental builds keep each input file's digest and parsed sections here
+BUILD_CACHE_SUFFIX = ".build.json"
+BUILD_CACHE_VERSION = 4
 
 def parse_docstring_block(block):
     """Parse a triple-quoted docstring block into a structured section."""
@@ -36,29 +50,230 @@ def parse_docstring_block(block):
         "title": title,
         "purpose": purpose,
         "syntax": syntax,
-        "examples": examples
+        "examples": examples,
+        # Code blocks of each example, so the search never re-segments them
+        "example_blocks": compile_example_blocks(examples)
     }
 
-def compile_reference(input_files, output_file):
-    """Compile the reference guide from multiple text files to JSON."""
-    reference = {
-        "title": "Python Reference Guide",
-        "categories": {}
-    }
+def category_name_for(input_file):
+    """Return the category name a reference file is compiled under."""
+    return os.path.splitext(os.path.basename(input_file))[0].replace('python_', '').replace('_', ' ').title()
+
+def parse_reference_file(input_file):
+    """Parse one reference file into its category name and sections."""
+    sections = []
+    # Every triple-quoted block, found in a single streaming pass
+    for docstring in iter_file_docstrings(input_file):
+        section = parse_docstring_block(docstring.text)
+        if section:
+            sections.append(section)
+    return category_name_for(input_file), sections
+
+def _load_source(input_file, cached_digest=None):
+    """Read and parse one input file, skipping the parse if its digest equals cached_digest.
+
+    Returns (digest, category name, sections); the last two are None when the
+    file is unchanged. Runs in worker processes for parallel compiles.
+    """
+    digest = source_digest(input_file).hex()
+    if digest == cached_digest:
+        return digest, None, None
+    category_name, sections = parse_reference_file(input_file)
+    return digest, category_name, sections
+
+def build_cache_path_for(output_file):
+    """Return the path of the incremental build cache that belongs to an output file."""
+    return os.path.splitext(output_file)[0] + BUILD_CACHE_SUFFIX
+
+def _load_build_cache(path):
+    """Load a build cache, or an empty one if it is missing or from another version."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {"files": []}
+    if cache.get("version") != BUILD_CACHE_VERSION:
+        return {"files": []}
+    return cache
+
+class ReferenceJsonWriter:
+    """Writes a compiled reference one section at a time.
+
+    The output is byte-for-byte what json.dump(reference, f, indent=2,
+    ensure_ascii=False) produces for the same categories and sections.
+    """
+
+    def __init__(self, f, title):
+        self._f = f
+        self._categories = 0
+        self._sections = 0
+        f.write('{\n  "title": ' + json.dumps(title, ensure_ascii=False) + ',\n  "categories": {')
+
+    def begin_category(self, name):
+        self._f.write((',' if self._categories else '') + '\n    ' + json.dumps(name, ensure_ascii=False) + ': [')
+        self._categories += 1
+        self._sections = 0
+
+    def add_section(self, section):
+        text = json.dumps(section, indent=2, ensure_ascii=False)
+        self._f.write((',' if self._sections else '') + '\n      ' + text.replace('\n', '\n      '))
+        self._sections += 1
+
+    def end_category(self):
+        self._f.write('\n    ]' if self._sections else ']')
+
+    def close(self):
+        self._f.write('\n  }\n}' if self._categories else '}\n}')
+
+class ReferenceJsonlWriter:
+    """Writes a compiled reference as JSON Lines: one {"category": ..., **section} record per line."""
+
+    def __init__(self, f, title):
+        self._f = f
+        self._category = None
+
+    def begin_category(self, name):
+        self._category = name
+
+    def add_section(self, section):
+        record = {"category": self._category}
+        record.update(section)
+        self._f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def end_category(self):
+        pass
+
+    def close(self):
+        pass
+
+def _effective_inputs(input_files):
+    """Return the input files that end up in the output, in output order.
+
+    Files sharing a category name overwrite each other: the category keeps
+    the position of its first file and the sections of its last one, as it
+    would in a dictionary.
+    """
+    last_file = {}
     for input_file in input_files:
-        with open(input_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-        category_name = os.path.splitext(os.path.basename(input_file))[0].replace('python_', '').replace('_', ' ').title()
-        # Find all triple-quoted blocks
-        blocks = re.findall(r'"""(.*?)"""', content, re.DOTALL)
-        sections = []
-        for block in blocks:
-            section = parse_docstring_block(block)
-            if section:
-                sections.append(section)
-        reference["categories"][category_name] = sections
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(reference, f, indent=2, ensure_ascii=False)
+        last_file[category_name_for(input_file)] = input_file
+    return list(last_file.values())
+
+def iter_reference_sources(input_files, cached_digests, workers=None):
+    """Yield (digest, category name, sections) for every input file, in input order.
+
+    With workers > 1 files are read and parsed across a process pool, a
+    bounded batch at a time so finished results don't pile up in memory.
+    """
+    if not (workers and workers > 1 and len(input_files) > 1):
+        for input_file, cached_digest in zip(input_files, cached_digests):
+            yield _load_source(input_file, cached_digest)
+        return
+
+    batch = workers * 4
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for start in range(0, len(input_files), batch):
+            # map() yields results in input order, whatever order the workers finish in
+            yield from pool.map(_load_source, input_files[start:start + batch], cached_digests[start:start + batch])
+
+def compile_reference(input_files, output_file, incremental=False, workers=None, search_index=True):
+    """Compile the reference guide from multiple text files to JSON, a section store and a search index.
+
+    Sections are streamed from the parser straight into the output and the
+    store, so only one input file's sections are held at a time. The search
+    index is then built in a second pass over the finished store, spilling
+    its postings to disk (see reference_index.IndexBuilder); with
+    search_index=False it is left for the search to build on first use. An
+    output file ending in .jsonl is written as JSON Lines, one record per
+    section.
+
+    With incremental=True only input files whose contents changed since the
+    previous incremental build are re-parsed. The search index is always
+    rebuilt from the sections written, since its flat arrays cannot be
+    patched in place.
+    With workers > 1 input files are read and parsed across a process pool;
+    the output does not depend on the order in which they finish.
+    """
+    input_files = _effective_inputs(input_files)
+    cache_path = build_cache_path_for(output_file)
+    previous = _load_build_cache(cache_path) if incremental else {"files": []}
+    previous_by_path = {entry["path"]: entry for entry in previous["files"]}
+    cached_digests = [previous_by_path.get(path, {}).get("digest") for path in input_files]
+
+    entries = []
+    store = StoreWriter(store_path_for(output_file))
+    tmp_output = output_file + ".tmp"
+    writer_class = ReferenceJsonlWriter if output_file.endswith(".jsonl") else ReferenceJsonWriter
+    with open(tmp_output, 'w', encoding='utf-8') as f:
+        writer = writer_class(f, "Python Reference Guide")
+        sources = iter_reference_sources(input_files, cached_digests, workers)
+        for input_file, (digest, category_name, sections) in zip(input_files, sources):
+            if sections is None:
+                old = previous_by_path[input_file]
+                category_name, sections = old["category"], old["sections"]
+
+            writer.begin_category(category_name)
+            for section in sections:
+                writer.add_section(section)
+                record = {"category": category_name}
+                record.update(section)
+                store.add(record)
+            writer.end_category()
+
+            if incremental:
+                entries.append({
+                    "path": input_file,
+                    "digest": digest,
+                    "category": category_name,
+                    "sections": sections
+                })
+        writer.close()
+    os.replace(tmp_output, output_file)
+
+    # Finish the section store and index it, both tied to the output we just wrote
+    digest = source_digest(output_file)
+    store.close(digest)
+    if search_index:
+        store = open_store(store_path_for(output_file), digest)
+        try:
+            with build_index(store) as index:
+                save_index(index, index_path_for(output_file), digest)
+        finally:
+            store.close()
+
+    if incremental:
+        with open(cache_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "version": BUILD_CACHE_VERSION,
+                "files": entries
+            }, f, ensure_ascii=False)
+
+def prerender_reference(output_file, widths, color_systems=("truecolor",)):
+    """Pre-render the example code blocks of a compiled reference into its render cache file.
+
+    The search then displays these blocks without highlighting them again on
+    terminals of one of the given widths and color systems.
+    """
+    from render_cache import RenderCache, load_render_cache, prerender, render_path_for, save_render_cache
+
+    store = open_store(store_path_for(output_file), source_digest(output_file))
+    if store is None:
+        raise RuntimeError(f"{output_file} has no up-to-date section store; compile it first")
+    blocks = []
+    try:
+        for record in store:
+            for code_blocks in example_code_blocks(record.get("examples", []), blocks_by_digest(record.get("example_blocks"))):
+                blocks.extend(block.strip() for block in code_blocks if block.strip())
+    finally:
+        store.close()
+
+    path = render_path_for(output_file)
+    # Keep what is already rendered for other terminals
+    cache = RenderCache(max_bytes=None)
+    for key, segments in load_render_cache(path, max_bytes=None).items():
+        cache.put(key, segments)
+    prerender(cache, dict.fromkeys(blocks), widths, color_systems)
+    save_render_cache(cache, path)
+    return len(cache)
 
 def search_reference(json_file, query):
     """Search the reference guide for a specific query."""
@@ -86,6 +301,19 @@ def search_reference(json_file, query):
     return results
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile the Python reference guide.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only re-parse input files that changed since the last incremental build")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Parse input files across this many processes")
+    parser.add_argument("--no-index", action="store_true",
+                        help="Skip building the search index; the search builds it on first use")
+    parser.add_argument("--prerender-width", type=int, action="append", default=[],
+                        help="Pre-render syntax-highlighted examples for terminals this wide (repeatable)")
+    parser.add_argument("--color-system", action="append", default=[],
+                        choices=["standard", "256", "truecolor", "windows"],
+                        help="Color systems to pre-render for (repeatable, default truecolor)")
+    args = parser.parse_args()
     input_files = [
         "Info/python_data_manipulations.py",
         "Info/python_list_operations.py",
@@ -93,7 +321,11 @@ if __name__ == "__main__":
         "Info/python_number_conversions.py",
         "Info/python_string_manipulations.py"
     ]
-    compile_reference(input_files, "python_reference.json")
+    compile_reference(input_files, "python_reference.json", incremental=args.incremental, workers=args.workers,
+                      search_index=not args.no_index)
+    if args.prerender_width:
+        count = prerender_reference("python_reference.json", args.prerender_width, args.color_system or ["truecolor"])
+        print(f"Pre-rendered {count} code blocks")
     query = "list comprehension"
     results = search_reference("python_reference.json", query)
     print(f"\nSearch results for '{query}':")
@@ -0,0 +1,122 @@
+"""
+Docstring Extractor
+===================
+
+Single-pass extraction of the triple-quoted blocks that make up the reference
+source files. A small line scanner skips comments and ordinary string
+literals the way Python's tokenizer does, so a triple quote inside a comment
+or another string literal is never mistaken for a section boundary. Unlike
+the tokenize module it does not care about indentation or anything else
+outside of strings and comments, so plain-text input such as compiled.txt
+is scanned to the end, and input is read one line at a time instead of
+being loaded and re-split as a whole.
+
+Used by compile_reference.py, python_reference_search_app.py and
+simple_compile.py.
+"""
+
+import re
+import warnings
+from collections import namedtuple
+
+# text: the block's contents between the quotes, as written in the source
+# start / end: (line, column) of the opening and closing quotes, lines from 1
+Docstring = namedtuple("Docstring", ["text", "start", "end"])
+
+# Next comment or string opening outside of a string; group 1 is the quote.
+# A quote opens a string after a prefix at the start of a word, or after a
+# character that cannot end a name; in "don't" it is just an apostrophe.
+_OPENING = re.compile(r"""#|(?:\b[rRuUbBfF]{1,2}|(?<!\w))("{3}|'{3}|"|')""")
+
+# Rest of a one-line string literal after its opening quote
+_SINGLE_CLOSE = {
+    '"': re.compile(r'(?:[^"\\\n]|\\.)*"'),
+    "'": re.compile(r"(?:[^'\\\n]|\\.)*'"),
+}
+
+# A backslash escape (skipped) or the closing quotes of a triple-quoted string
+_TRIPLE_CLOSE = {
+    '"""': re.compile(r'\\[\s\S]|"""'),
+    "'''": re.compile(r"\\[\s\S]|'''"),
+}
+
+
+def iter_docstrings(readline, name="<input>"):
+    """Yield a Docstring for every \"\"\"-quoted string literal read through readline.
+
+    readline is a callable returning one line of source text per call, such
+    as the readline method of a text file. A quote that cannot open a string
+    or is never closed on its line (an apostrophe in plain text) is taken
+    literally. A triple-quoted string still open at the end of the input is
+    dropped with a warning naming the input (name) and its first line.
+    """
+    line_no = 0
+    # Open triple-quoted string: its quotes, start position and text so far
+    quote = None
+    start = None
+    pieces = []
+    opening_search = _OPENING.search
+
+    lines = iter(readline, '')
+    for line in lines:
+        line_no += 1
+        # Most lines are either inside a block without closing it, or hold
+        # no quote at all
+        if quote is not None:
+            if quote not in line:
+                # Take the rest of the block up to its closing line in one go
+                append = pieces.append
+                append(line)
+                for line in lines:
+                    line_no += 1
+                    if quote in line:
+                        break
+                    append(line)
+                else:
+                    break
+        elif '"' not in line and "'" not in line:
+            continue
+
+        pos = 0
+        length = len(line)
+        while pos < length:
+            if quote is not None:
+                close = _TRIPLE_CLOSE[quote]
+                match = close.search(line, pos)
+                while match is not None and match.group() != quote:
+                    match = close.search(line, match.end())
+                if match is None:
+                    pieces.append(line[pos:])
+                    break
+                pieces.append(line[pos:match.start()])
+                if quote == '"""':
+                    yield Docstring(''.join(pieces), start, (line_no, match.end()))
+                quote = None
+                pieces = []
+                pos = match.end()
+                continue
+
+            match = opening_search(line, pos)
+            if match is None:
+                break
+            opening = match.group(1)
+            if opening is None:
+                # A comment runs to the end of the line
+                break
+            if len(opening) == 3:
+                quote = opening
+                start = (line_no, match.start())
+                pos = match.end()
+                continue
+            closing = _SINGLE_CLOSE[opening].match(line, match.end())
+            pos = closing.end() if closing is not None else match.end()
+
+    if quote is not None:
+        warnings.warn(f"{name}:{start[0]}: unterminated triple-quoted string, ignored to the end of the input",
+                      stacklevel=2)
+
+
+def iter_file_docstrings(path):
+    """Yield the Docstrings of a file, reading it line by line."""
+    with open(path, 'r', encoding='utf-8') as f:
+        yield from iter_docstrings(f.readline, path)
@@ -8,7 +8,14 @@ using fuzzy matching and provides rich formatted output.
 
 import json
 import os
+import re
+import sqlite3
+import sys
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
 from pathlib import Path
+from types import MappingProxyType
 from typing import List, Dict, Optional
 from fuzzywuzzy import fuzz
 from rich.console import Console
@@ -18,31 +25,100 @@ from rich.prompt import Prompt
 import typer
 from typer import Typer
 
+# Shared modules live next to search.py at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from result_format import FORMATS, write_results
+from docstring_extractor import iter_file_docstrings
+
 # Initialize Typer app and Rich console
 app = Typer()
 console = Console()
 
+# One search hit: the id of a reference (see ReferenceDatabase.get) and its score
+SearchResult = namedtuple("SearchResult", ["id", "score"])
+
 class ReferenceDatabase:
     """Manages the reference database and search operations."""
     
     def __init__(self, db_path: str = "reference_db.json"):
         self.db_path = db_path
         self.data = self._load_database()
+        self._transaction_depth = 0
+        self._snapshot = None
     
     def _load_database(self) -> Dict:
-        """Load the reference database from JSON file."""
+        """Load the reference database from JSON file.
+        
+        Every search scans all references, so they are decoded once here
+        rather than per query.
+        """
         if os.path.exists(self.db_path):
             with open(self.db_path, 'r', encoding='utf-8') as f:
                 return json.load(f)
         return {"references": []}
     
+    def snapshot(self):
+        """
+        Return a read-only sequence of the current references.
+        
+        The list is copied into a tuple, which is reused until the
+        references change, so searches running in other threads never see
+        a list that is being modified.
+        """
+        references = self.data["references"]
+        snapshot = self._snapshot
+        if snapshot is None or snapshot[0] is not references or len(snapshot[1]) != len(references):
+            snapshot = self._snapshot = (references, tuple(references))
+        return snapshot[1]
+    
+    def get(self, reference_id: int):
+        """Return a read-only view of a reference by id (its position in the database)."""
+        return MappingProxyType(self.snapshot()[reference_id])
+    
     def _save_database(self):
-        """Save the reference database to JSON file."""
-        with open(self.db_path, 'w', encoding='utf-8') as f:
-            json.dump(self.data, f, indent=2, ensure_ascii=False)
+        """Save the reference database to JSON file.
+        
+        The file is written next to the database and renamed over it, so
+        readers never see a half-written database.
+        """
+        tmp_path = self.db_path + ".tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.db_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+    
+    @contextmanager
+    def transaction(self):
+        """
+        Group changes into a single save.
+        
+        Changes made inside the block are saved once, when the outermost
+        transaction exits. If the block raises, nothing is written and the
+        in-memory data is reloaded from the last saved database.
+        
+        Example:
+            with db.transaction():
+                for title, content in sections:
+                    db.add_reference(title, content, category, tags)
+        """
+        self._transaction_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._transaction_depth -= 1
+            if not self._transaction_depth:
+                self.data = self._load_database()
+            raise
+        self._transaction_depth -= 1
+        if not self._transaction_depth:
+            self._save_database()
     
     def add_reference(self, title: str, content: str, category: str, tags: List[str]):
-        """Add a new reference to the database."""
+        """Add a new reference to the database, saving it unless a transaction is open."""
         reference = {
             "title": title,
             "content": content,
@@ -50,98 +126,319 @@ class ReferenceDatabase:
             "tags": tags
         }
         self.data["references"].append(reference)
-        self._save_database()
+        if not self._transaction_depth:
+            self._save_database()
+    
+    def clear(self):
+        """Remove every reference, saving unless a transaction is open."""
+        self.data = {"references": []}
+        if not self._transaction_depth:
+            self._save_database()
     
-    def search(self, query: str, threshold: int = 60) -> List[Dict]:
+    def search(self, query: str, threshold: int = 60) -> List[SearchResult]:
         """
         Search the database using fuzzy matching.
         
+        The references are never modified, so one database can serve
+        searches from many threads; look matches up with get().
+        
         Args:
             query: Search query
             threshold: Minimum similarity score (0-100)
             
         Returns:
-            List of matching references
+            SearchResults of the matching references, best first
         """
+        query_lower = query.lower()
         results = []
-        for ref in self.data["references"]:
-            # Search in title, content, and tags
-            title_score = fuzz.partial_ratio(query.lower(), ref["title"].lower())
-            content_score = fuzz.partial_ratio(query.lower(), ref["content"].lower())
-            tag_scores = [fuzz.partial_ratio(query.lower(), tag.lower()) for tag in ref["tags"]]
-            
-            # Get the highest score
-            max_score = max(title_score, content_score, max(tag_scores) if tag_scores else 0)
-            
+        for reference_id, ref in enumerate(self.snapshot()):
+            max_score = _fuzzy_score(query_lower, ref)
             if max_score >= threshold:
-                ref["score"] = max_score
-                results.append(ref)
+                results.append(SearchResult(reference_id, max_score))
         
         # Sort by score
-        return sorted(results, key=lambda x: x["score"], reverse=True)
+        return sorted(results, key=lambda x: x.score, reverse=True)
+
+def _fuzzy_scores(query_lower: str, ref: Dict) -> Dict[str, int]:
+    """Partial match of a lowercased query against a reference's title, content and tags."""
+    # Search in title, content, and tags
+    title_score = fuzz.partial_ratio(query_lower, ref["title"].lower())
+    content_score = fuzz.partial_ratio(query_lower, ref["content"].lower())
+    tag_scores = [fuzz.partial_ratio(query_lower, tag.lower()) for tag in ref["tags"]]
+    return {"title": title_score, "content": content_score, "tags": max(tag_scores) if tag_scores else 0}
 
-def compile_references():
-    """Compile all reference files into the database."""
-    db = ReferenceDatabase()
+def _fuzzy_score(query_lower: str, ref: Dict) -> int:
+    """Best partial match of a lowercased query against a reference's title, content and tags."""
+    # Get the highest score
+    return max(_fuzzy_scores(query_lower, ref).values())
+
+class SQLiteReferenceDatabase:
+    """
+    Reference database stored in SQLite with an FTS5 full-text index.
+    
+    Searching asks the index for the best bm25 matches of the query words
+    (each treated as a prefix) and applies the same fuzzy scoring as
+    ReferenceDatabase to those candidates only. Nothing is loaded into
+    memory up front, and the database runs in WAL mode so several
+    processes can read it while one writes. Any thread may search; changes
+    are made from the thread that opened the database.
+    
+    Unlike the JSON backend, a reference has to share at least one word
+    prefix with the query to be found; pure misspellings are not matched.
+    """
+    
+    # bm25 weights of the title, content, tags and category columns
+    BM25_WEIGHTS = (10.0, 1.0, 5.0, 2.0)
+    
+    def __init__(self, db_path: str = "reference_db.sqlite", candidate_limit: int = 200):
+        # Absolute, so connections opened later by other threads find the same file
+        self.db_path = os.path.abspath(db_path)
+        self.candidate_limit = candidate_limit
+        self._transaction_depth = 0
+        self._conn = sqlite3.connect(db_path)
+        self._owner = threading.get_ident()
+        self._local = threading.local()
+        self._readers = []
+        self._readers_lock = threading.Lock()
+        try:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS reference "
+                "USING fts5(title, content, tags, category)"
+            )
+            self._conn.commit()
+        except sqlite3.OperationalError as e:
+            self._conn.close()
+            raise RuntimeError(f"SQLite backend unavailable ({e}); is FTS5 compiled in?") from e
+    
+    def _commit(self):
+        if not self._transaction_depth:
+            self._conn.commit()
+    
+    def _reader(self) -> sqlite3.Connection:
+        """
+        Return the connection for reads in the calling thread.
+        
+        The thread that opened the database reads through its own connection
+        and so sees its uncommitted changes; every other thread gets a
+        connection of its own that sees the last committed state.
+        """
+        if threading.get_ident() == self._owner:
+            return self._conn
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            with self._readers_lock:
+                self._readers.append(conn)
+        return conn
+    
+    def get(self, reference_id: int):
+        """Return a read-only view of a reference by id (its SQLite rowid)."""
+        row = self._reader().execute(
+            "SELECT title, content, tags, category FROM reference WHERE rowid = ?",
+            (reference_id,)
+        ).fetchone()
+        if row is None:
+            raise IndexError(f"No reference with id {reference_id}")
+        title, content, tags, category = row
+        return MappingProxyType({
+            "title": title,
+            "content": content,
+            "category": category,
+            "tags": tags.split()
+        })
+    
+    @contextmanager
+    def transaction(self):
+        """Group changes into a single SQLite transaction, rolled back if the block raises."""
+        self._transaction_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._transaction_depth -= 1
+            if not self._transaction_depth:
+                self._conn.rollback()
+            raise
+        self._transaction_depth -= 1
+        self._commit()
+    
+    def add_reference(self, title: str, content: str, category: str, tags: List[str]):
+        """Add a new reference to the database, committing unless a transaction is open."""
+        self._conn.execute(
+            "INSERT INTO reference (title, content, tags, category) VALUES (?, ?, ?, ?)",
+            (title, content, " ".join(tags), category)
+        )
+        self._commit()
     
-    # Clear existing data
-    db.data = {"references": []}
+    def clear(self):
+        """Remove every reference, committing unless a transaction is open."""
+        self._conn.execute("DELETE FROM reference")
+        self._commit()
     
-    # Find all Python reference files
-    ref_files = Path(".").glob("python_*.py")
+    def _match_expression(self, query: str) -> Optional[str]:
+        """Turn a query into an FTS5 expression matching any of its words as a prefix."""
+        words = re.findall(r"\w+", query.lower())
+        if not words:
+            return None
+        return " OR ".join(f'"{word}"*' for word in dict.fromkeys(words))
     
-    for file_path in ref_files:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+    def search(self, query: str, threshold: int = 60) -> List[SearchResult]:
+        """
+        Search the database: FTS5 candidates reranked by fuzzy matching.
+        
+        Safe to call from several threads at once; look matches up with get().
+        
+        Args:
+            query: Search query
+            threshold: Minimum similarity score (0-100)
             
+        Returns:
+            SearchResults of the matching references, best first
+        """
+        expression = self._match_expression(query)
+        if expression is None:
+            return []
+        rows = self._reader().execute(
+            "SELECT rowid, title, content, tags FROM reference "
+            "WHERE reference MATCH ? ORDER BY bm25(reference, ?, ?, ?, ?) LIMIT ?",
+            (expression, *self.BM25_WEIGHTS, self.candidate_limit)
+        )
+        
+        query_lower = query.lower()
+        results = []
+        for reference_id, title, content, tags in rows:
+            ref = {"title": title, "content": content, "tags": tags.split()}
+            max_score = _fuzzy_score(query_lower, ref)
+            if max_score >= threshold:
+                results.append(SearchResult(reference_id, max_score))
+        
+        # Sort by score; the bm25 order breaks ties
+        return sorted(results, key=lambda x: x.score, reverse=True)
+    
+    def close(self):
+        with self._readers_lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers.clear()
+        self._conn.close()
+
+# Storage backends and the database file each one uses by default
+DATABASE_BACKENDS = {
+    "json": (ReferenceDatabase, "reference_db.json"),
+    "sqlite": (SQLiteReferenceDatabase, "reference_db.sqlite"),
+}
+
+def open_database(backend: str = "json", db_path: Optional[str] = None):
+    """Open the reference database of the given backend ("json" or "sqlite")."""
+    try:
+        database_class, default_path = DATABASE_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown backend {backend!r}; expected one of {', '.join(DATABASE_BACKENDS)}")
+    return database_class(db_path or default_path)
+
+def _open_database_option(backend: str):
+    """open_database() for the CLI commands, reporting problems as usage errors."""
+    try:
+        return open_database(backend)
+    except (ValueError, RuntimeError) as e:
+        raise typer.BadParameter(str(e), param_hint="--backend")
+
+BACKEND_OPTION_HELP = "Storage backend: json or sqlite (FTS5)"
+
+# TSV columns of search --format tsv
+RESULT_COLUMNS = ["rank", "score", "title", "category", "tags", "file", "content",
+                  "scores.title", "scores.content", "scores.tags"]
+
+def _result_records(db, query: str, results: List[SearchResult]) -> List[Dict]:
+    """Build the records written by search --format, with the score of each field."""
+    query_lower = query.lower()
+    records = []
+    for rank, match in enumerate(results, 1):
+        ref = db.get(match.id)
+        records.append({
+            "rank": rank,
+            "score": match.score,
+            "title": ref["title"],
+            "category": ref["category"],
+            "tags": list(ref["tags"]),
+            "file": ref.get("file"),
+            "content": ref["content"],
+            "scores": _fuzzy_scores(query_lower, ref)
+        })
+    return records
+
+def compile_references(db=None):
+    """Compile all reference files into the database (the JSON one by default)."""
+    if db is None:
+        db = ReferenceDatabase()
+    
+    # Write the whole database once, at the end, instead of once per section
+    with db.transaction():
+        # Clear existing data
+        db.clear()
+        
+        # Find all Python reference files
+        ref_files = Path(".").glob("python_*.py")
+        
+        for file_path in ref_files:
             # Extract sections (text between triple quotes)
-            sections = content.split('"""')
-            
-            for i in range(1, len(sections), 2):
-                if i + 1 < len(sections):
-                    section = sections[i].strip()
-                    
-                    # Extract title and content
-                    lines = section.split('\n')
-                    title = lines[0].strip()
-                    
-                    # Extract category from file name
-                    category = file_path.stem.replace('python_', '').replace('_', ' ').title()
-                    
-                    # Generate tags from content
-                    content_lower = section.lower()
-                    tags = []
-                    if "how to" in content_lower:
-                        tags.append("how-to")
-                    if "example" in content_lower:
-                        tags.append("example")
-                    if "purpose" in content_lower:
-                        tags.append("purpose")
-                    
-                    # Add to database
-                    db.add_reference(title, section, category, tags)
+            for docstring in iter_file_docstrings(file_path):
+                section = docstring.text.strip()
+                
+                # Extract title and content
+                lines = section.split('\n')
+                title = lines[0].strip()
+                
+                # Extract category from file name
+                category = file_path.stem.replace('python_', '').replace('_', ' ').title()
+                
+                # Generate tags from content
+                content_lower = section.lower()
+                tags = []
+                if "how to" in content_lower:
+                    tags.append("how-to")
+                if "example" in content_lower:
+                    tags.append("example")
+                if "purpose" in content_lower:
+                    tags.append("purpose")
+                
+                # Add to database
+                db.add_reference(title, section, category, tags)
     
     console.print("[green]References compiled successfully![/green]")
 
 @app.command()
-def compile():
+def compile(
+    backend: str = typer.Option("json", "--backend", "-b", help=BACKEND_OPTION_HELP)
+):
     """Compile all reference files into the searchable database."""
-    compile_references()
+    compile_references(_open_database_option(backend))
 
 @app.command()
 def search(
     query: str = typer.Argument(..., help="Search query"),
-    threshold: int = typer.Option(60, "--threshold", "-t", help="Minimum match threshold (0-100)")
+    threshold: int = typer.Option(60, "--threshold", "-t", help="Minimum match threshold (0-100)"),
+    backend: str = typer.Option("json", "--backend", "-b", help=BACKEND_OPTION_HELP),
+    output_format: Optional[str] = typer.Option(
+        None, "--format", "-f", help=f"Write results as {', '.join(FORMATS)} instead of Rich output"
+    )
 ):
     """Search the reference database."""
-    db = ReferenceDatabase()
+    if output_format is not None and output_format not in FORMATS:
+        raise typer.BadParameter(f"expected one of {', '.join(FORMATS)}", param_hint="--format")
+    db = _open_database_option(backend)
     results = db.search(query, threshold)
     
+    if output_format is not None:
+        write_results(_result_records(db, query, results), output_format, columns=RESULT_COLUMNS)
+        return
+    
     if not results:
         console.print("[yellow]No results found.[/yellow]")
         return
     
-    for i, result in enumerate(results, 1):
+    for i, match in enumerate(results, 1):
+        result = db.get(match.id)
         # Print in reference file style
         console.print(f"\n{'='*80}", style="cyan")
         console.print(f"File: [bold]{result.get('file', 'unknown')}[/bold]")
@@ -151,9 +448,11 @@ def search(
         console.print(f"{'='*80}\n", style="cyan")
 
 @app.command()
-def interactive():
+def interactive(
+    backend: str = typer.Option("json", "--backend", "-b", help=BACKEND_OPTION_HELP)
+):
     """Start interactive search mode."""
-    db = ReferenceDatabase()
+    db = _open_database_option(backend)
     
     console.print("[bold blue]Python Reference Search[/bold blue]")
     console.print("Type 'exit' to quit, 'help' for help")
@@ -178,7 +477,8 @@ def interactive():
             console.print("[yellow]No results found.[/yellow]")
             continue
         
-        for i, result in enumerate(results, 1):
+        for i, match in enumerate(results, 1):
+            result = db.get(match.id)
             console.print(f"\n{'='*80}", style="cyan")
             console.print(f"File: [bold]{result.get('file', 'unknown')}[/bold]")
             console.print(f"Section: [bold]{result['title']}[/bold]")
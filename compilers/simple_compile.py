@@ -1,34 +1,35 @@
 import json
 
-sections = []
-with open('compiled.txt', 'r', encoding='utf-8') as f:
-    lines = f.readlines()
+from docstring_extractor import iter_docstrings
 
-in_section = False
-current = []
-for line in lines:
-    if line.strip().startswith('"""'):
-        if in_section:
-            # End of section
-            if current:
-                # Find title
-                non_empty = [l for l in current if l.strip()]
-                title = non_empty[0].strip() if non_empty else "Untitled"
-                content = ''.join(current).strip()
-                sections.append({
-                    "title": title,
-                    "content": content,
-                    "file": "compiled.txt"
-                })
-            current = []
-            in_section = False
-        else:
-            in_section = True
-            current = []
-    elif in_section:
-        current.append(line)
+def iter_sections(readline):
+    """Yield a section for every triple-quoted block read through readline."""
+    for docstring in iter_docstrings(readline):
+        content = docstring.text.strip()
+        if not content:
+            continue
+        # Find title
+        title = content.split('\n', 1)[0].strip()
+        yield {
+            "title": title,
+            "content": content,
+            "file": "compiled.txt"
+        }
 
-with open('compiled_manual.json', 'w', encoding='utf-8') as f:
-    json.dump(sections, f, indent=2, ensure_ascii=False)
+def write_json_array(items, f):
+    """Write items as a JSON array one at a time; same output as json.dump(list(items), f, indent=2)."""
+    count = 0
+    for item in items:
+        text = json.dumps(item, indent=2, ensure_ascii=False)
+        f.write(('[\n  ' if not count else ',\n  ') + text.replace('\n', '\n  '))
+        count += 1
+    f.write('\n]' if count else '[]')
+    return count
 
-print(f"Extracted {len(sections)} sections to compiled_manual.json")
\ No newline at end of file
+if __name__ == "__main__":
+    # Stream from compiled.txt to the JSON file without holding either in memory
+    with open('compiled.txt', 'r', encoding='utf-8') as src, \
+            open('compiled_manual.json', 'w', encoding='utf-8') as f:
+        count = write_json_array(iter_sections(src.readline), f)
+
+    print(f"Extracted {count} sections to compiled_manual.json")
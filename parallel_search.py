@@ -0,0 +1,94 @@
+"""
+Parallel Reference Scoring
+==========================
+
+Shards the sections of a reference across worker processes. Each shard is
+served by its own single-process executor whose worker memory-maps the index
+file when it starts, so the section text is shared through the page cache
+and a query only ships the query itself and the candidate ids that fall into
+the shard. Every worker returns its own top-N, and the shards' results are
+merged into the overall top-N.
+"""
+
+import bisect
+import heapq
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from reference_index import ReferenceIndex, load_index
+from scoring import query_token_ids, section_record, top_sections
+
+# Worker process state, set once by _init_worker
+_index = None
+_keyword_weights = {}
+
+
+def _rank_key(result):
+    # Best score first; equal scores keep section order like a stable sort
+    return result[0], -result[1]
+
+
+def _init_worker(source, digest, keyword_weights):
+    global _index, _keyword_weights
+    # source is the path of the index file, or its bytes for an index held in memory
+    if isinstance(source, str):
+        _index = load_index(source, digest)
+        if _index is None:
+            raise ValueError(f"{source} no longer holds the index being searched")
+    else:
+        _index = ReferenceIndex(source)
+    _keyword_weights = keyword_weights
+
+
+def _score_shard(prepared, doc_ids, top_n):
+    sections = ((doc_id, section_record(_index, doc_id)) for doc_id in doc_ids)
+    word_ids = query_token_ids(_index, prepared[1])
+    return top_sections(prepared, sections, _keyword_weights, top_n, word_ids=word_ids)
+
+
+class ParallelScorer:
+    """Scores candidate sections across a fixed set of worker processes."""
+
+    def __init__(self, index, keyword_weights, workers=None):
+        # Workers receive the weights once, at start-up; compare against this
+        # copy to know when the scorer has to be rebuilt
+        self.keyword_weights = dict(keyword_weights)
+        workers = max(1, min(workers or os.cpu_count() or 1, len(index) or 1))
+        size = -(-len(index) // workers)
+        # First section id of every shard
+        self._starts = list(range(0, len(index), size)) or [0]
+        source = index.path if index.path is not None else index.to_bytes()
+        self._executors = []
+        for _ in self._starts:
+            self._executors.append(ProcessPoolExecutor(
+                max_workers=1,
+                initializer=_init_worker,
+                initargs=(source, index.digest, self.keyword_weights)
+            ))
+
+    def score(self, prepared, candidates, top_n, advance=None):
+        """Score sorted candidate ids and return the best top_n results, best first."""
+        futures = []
+        for shard, start in enumerate(self._starts):
+            lo = bisect.bisect_left(candidates, start)
+            hi = bisect.bisect_left(candidates, self._starts[shard + 1]) if shard + 1 < len(self._starts) else len(candidates)
+            if lo < hi:
+                futures.append((hi - lo, self._executors[shard].submit(_score_shard, prepared, candidates[lo:hi], top_n)))
+
+        merged = []
+        try:
+            for count, future in futures:
+                merged.extend(future.result())
+                if advance:
+                    advance(count)
+        except BaseException:
+            # advance may abandon the search; drop the shards that have not started
+            for _, future in futures:
+                future.cancel()
+            raise
+        return heapq.nlargest(top_n, merged, key=_rank_key)
+
+    def close(self):
+        for executor in self._executors:
+            executor.shutdown()
+        self._executors = []
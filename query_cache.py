@@ -0,0 +1,67 @@
+"""
+Query Result Cache
+==================
+
+Small LRU cache for search results, bounded both by number of entries and by
+the age of each entry. Hit and miss counters are kept so the cache can be
+sized from real traffic.
+"""
+
+import time
+from collections import OrderedDict
+
+
+def normalize_query(query):
+    """Return the form of a query used in cache keys: lowercased, single-spaced."""
+    return " ".join(query.lower().split())
+
+
+class QueryCache:
+    """LRU cache with a maximum size and a time-to-live per entry."""
+
+    def __init__(self, max_entries=256, ttl=300.0, clock=time.monotonic):
+        self.max_entries = max_entries
+        # Seconds an entry stays valid; None keeps entries until evicted
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            stored_at, value = entry
+            if self.ttl is None or self._clock() - stored_at < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        """Store a value, evicting the least recently used entries if full."""
+        self._entries[key] = (self._clock(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every entry; the hit and miss counters are kept."""
+        self._entries.clear()
+
+    def stats(self):
+        """Return the cache counters as a dictionary."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self._entries),
+            "max_entries": self.max_entries
+        }
+
+    def __len__(self):
+        return len(self._entries)
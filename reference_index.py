@@ -0,0 +1,626 @@
+"""
+Reference Search Index
+======================
+
+Inverted index over the sections of a compiled Python reference, so that a
+query only has to look at the sections that share a word or a character
+n-gram with it.
+
+The index lives next to the reference JSON as a binary file of flat typed
+arrays (see save_index / load_index) that is memory-mapped rather than
+decoded: the token and trigram dictionaries are sorted string tables found
+by binary search, postings are parallel blocks of 32-bit section ids and
+per-field term frequencies, and the lowercased text of the sections is one
+UTF-8 heap that is decoded a section at a time. Opening an index therefore
+costs about as much as opening the file, whatever the size of the
+reference. The file records the SHA-256 of the JSON it was built from, so an
+index left over from an older reference is detected and rebuilt instead of
+being used.
+
+IndexBuilder writes the file from a stream of sections, spilling postings to
+sorted runs on disk, so building an index never holds the reference or all
+of its postings in memory.
+"""
+
+import bisect
+import hashlib
+import heapq
+import itertools
+import math
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+from array import array
+from operator import itemgetter
+
+# Searchable fields of a section, in the order they are joined into the text
+# blob used for scoring.
+FIELDS = ("title", "purpose", "syntax", "examples")
+
+# Length of the character n-grams kept in the n-gram postings. Only full
+# trigrams are indexed: shorter grams occur in nearly every section, so
+# query words shorter than this are looked up as token prefixes instead.
+NGRAM_SIZE = 3
+
+# BM25F parameters for the cheap first ranking stage. Term frequencies are
+# weighted per field (in FIELDS order) before saturation.
+BM25_K1 = 1.2
+BM25_B = 0.75
+BM25_FIELD_WEIGHTS = (2.0, 1.5, 1.5, 1.0)
+
+# Binary index file layout (little endian): magic, format version, SHA-256 of
+# the source JSON and the number of sections, then an (offset, length) entry
+# per block and the blocks themselves, each starting on an 8-byte boundary.
+# Bump INDEX_VERSION whenever the layout changes.
+INDEX_MAGIC = b"PRSIDX"
+INDEX_VERSION = 5
+INDEX_SUFFIX = ".idx"
+_HEADER = struct.Struct("<6sH32sI")
+_BLOCK = struct.Struct("<QQ")
+
+# Blocks of an index file, in file order. *_offsets are byte offsets into the
+# matching *_heap of sorted UTF-8 strings (one more offset than strings) and
+# *_starts the position of each string's postings (one more than strings).
+BLOCKS = (
+    "doc_lengths",                      # u32 per section: number of tokens
+    "token_offsets", "token_heap",
+    "token_starts",                     # u64 per token
+    "posting_ids",                      # u32 per posting: section id
+) + tuple(f"posting_tf_{name}" for name in FIELDS) + (  # u32 per posting and field
+    "gram_offsets", "gram_heap",
+    "gram_starts",                      # u64 per trigram
+    "gram_ids",                         # u32 per trigram posting: section id
+    "text_offsets",                     # u64 per section plus one: byte offset of its text
+    "text_heap",                        # lowercased field texts of each section, joined with spaces
+    "field_lengths",                    # u32 per section and field: length in characters
+)
+
+# Array typecodes of unsigned 32- and 64-bit integers
+_U32 = "I" if array("I").itemsize == 4 else "L"
+_U64 = "Q"
+_BYTE_ORDER_MATCHES = sys.byteorder == "little"
+
+# Posting values (u32) an IndexBuilder buffers before spilling them to a run
+# file; a run record is the UTF-8 key length and the values' byte length,
+# followed by both in native byte order
+SPILL_POSTINGS = 1 << 20
+_RUN_RECORD = struct.Struct("<II")
+
+
+def field_texts(section):
+    """Return the searchable text of each field of a section."""
+    return (
+        section.get("title", ""),
+        section.get("purpose", ""),
+        section.get("syntax", ""),
+        " ".join(section.get("examples", []))
+    )
+
+
+def char_ngrams(word, size=NGRAM_SIZE):
+    """Return the set of character n-grams of a word that are exactly size long."""
+    return {word[start:start + size] for start in range(len(word) - size + 1)}
+
+
+def query_ngrams(word):
+    """Return the n-grams of a query word that are looked up in the index.
+
+    Words shorter than NGRAM_SIZE have none; see ReferenceIndex.prefix_postings.
+    """
+    return char_ngrams(word)
+
+
+def section_terms(texts):
+    """Return (per-token per-field frequencies, token count) of lowercased field texts."""
+    frequencies = {}
+    length = 0
+    for field_no, text in enumerate(texts):
+        for token in text.split():
+            tfs = frequencies.get(token)
+            if tfs is None:
+                tfs = frequencies[token] = [0] * len(FIELDS)
+            tfs[field_no] += 1
+            length += 1
+    return frequencies, length
+
+
+def _typed(values, typecode):
+    """Return the little-endian bytes of an array of integers."""
+    values = values if isinstance(values, array) else array(typecode, values)
+    if not _BYTE_ORDER_MATCHES:
+        values = array(typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _write_run(path, postings):
+    """Write buffered postings (key -> u32 array) to a run file, in key order."""
+    with open(path, 'wb') as f:
+        for key in sorted(postings):
+            encoded = key.encode('utf-8')
+            values = postings[key].tobytes()
+            f.write(_RUN_RECORD.pack(len(encoded), len(values)))
+            f.write(encoded)
+            f.write(values)
+
+
+def _read_run(path):
+    """Yield the (key, u32 array) records of a run file, in key order."""
+    with open(path, 'rb') as f:
+        while True:
+            header = f.read(_RUN_RECORD.size)
+            if not header:
+                return
+            key_size, values_size = _RUN_RECORD.unpack(header)
+            key = f.read(key_size).decode('utf-8')
+            values = array(_U32)
+            values.frombytes(f.read(values_size))
+            yield key, values
+
+
+class IndexBuilder:
+    """Streams sections into the blocks of an index file in bounded memory.
+
+    The text and per-section arrays of each section go straight to temporary
+    block files. Postings are buffered as flat arrays and spilled to a run
+    file sorted by key whenever the buffer holds spill_postings values;
+    write() merges the runs into the final blocks. Use it as a context
+    manager (or call close()) to remove the temporary files.
+    """
+
+    def __init__(self, spill_postings=SPILL_POSTINGS):
+        self._dir = tempfile.TemporaryDirectory(prefix="reference-index-")
+        self._spill_postings = spill_postings
+        self._count = 0
+        self._text_size = 0
+        self._section_blocks = {
+            name: open(self._path(name), 'wb')
+            for name in ("doc_lengths", "text_offsets", "text_heap", "field_lengths")
+        }
+        self._section_blocks["text_offsets"].write(_typed([0], _U64))
+        # token -> u32 array holding section id and per-field term frequencies per posting
+        self._postings = {}
+        # trigram -> u32 array of section ids
+        self._gram_postings = {}
+        # token -> its trigrams, for the tokens of the buffered postings
+        self._token_grams = {}
+        # values held by the two buffers above
+        self._buffered = 0
+        # run files spilled so far, (token run, trigram run) each
+        self._runs = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _path(self, name):
+        return os.path.join(self._dir.name, name)
+
+    def add_section(self, section):
+        """Index a single section and return its id."""
+        doc_id = self._count
+        texts = tuple(text.lower() for text in field_texts(section))
+        frequencies, length = section_terms(texts)
+
+        blob = " ".join(texts).encode('utf-8')
+        self._text_size += len(blob)
+        blocks = self._section_blocks
+        blocks["doc_lengths"].write(_typed([length], _U32))
+        blocks["text_offsets"].write(_typed([self._text_size], _U64))
+        blocks["text_heap"].write(blob)
+        blocks["field_lengths"].write(_typed([len(text) for text in texts], _U32))
+
+        postings = self._postings
+        token_grams = self._token_grams
+        grams = set()
+        for token, tfs in frequencies.items():
+            values = postings.get(token)
+            if values is None:
+                values = postings[token] = array(_U32)
+                token_grams[token] = char_ngrams(token)
+            values.append(doc_id)
+            values.extend(tfs)
+            grams |= token_grams[token]
+        gram_postings = self._gram_postings
+        for gram in grams:
+            ids = gram_postings.get(gram)
+            if ids is None:
+                ids = gram_postings[gram] = array(_U32)
+            ids.append(doc_id)
+
+        self._count += 1
+        self._buffered += len(frequencies) * (1 + len(FIELDS)) + len(grams)
+        if self._buffered >= self._spill_postings:
+            self._spill()
+        return doc_id
+
+    def __len__(self):
+        return self._count
+
+    def _spill(self):
+        run_no = len(self._runs)
+        run = (self._path(f"tokens.{run_no}"), self._path(f"grams.{run_no}"))
+        _write_run(run[0], self._postings)
+        _write_run(run[1], self._gram_postings)
+        self._runs.append(run)
+        self._postings = {}
+        self._gram_postings = {}
+        self._token_grams = {}
+        self._buffered = 0
+
+    def _merged(self, kind, buffered):
+        """Yield (key, u32 values) over the runs of one kind and a buffer, merged in key order."""
+        sources = [_read_run(run[kind]) for run in self._runs]
+        sources.append((key, buffered[key]) for key in sorted(buffered))
+        # merge() keeps equal keys in source order, so section ids stay sorted
+        for key, group in itertools.groupby(heapq.merge(*sources, key=itemgetter(0)), key=itemgetter(0)):
+            values = array(_U32)
+            for _, part in group:
+                values.extend(part)
+            yield key, values
+
+    def _write_table(self, kind, buffered, names):
+        """Write merged postings to their offsets, heap, starts and value blocks.
+
+        A posting has one value per value block, interleaved in the buffers.
+        """
+        files = [open(self._path(name), 'wb') for name in names]
+        try:
+            offsets, heap, starts, *columns = files
+            stride = len(columns)
+            offsets.write(_typed([0], _U64))
+            starts.write(_typed([0], _U64))
+            heap_size = posting_count = 0
+            for key, values in self._merged(kind, buffered):
+                encoded = key.encode('utf-8')
+                heap.write(encoded)
+                heap_size += len(encoded)
+                offsets.write(_typed([heap_size], _U64))
+                for column_no, column in enumerate(columns):
+                    column.write(_typed(values[column_no::stride], _U32))
+                posting_count += len(values) // stride
+                starts.write(_typed([posting_count], _U64))
+        finally:
+            for f in files:
+                f.close()
+
+    def write(self, f, digest):
+        """Write the whole index file to a binary file object, tagged with the digest of its source."""
+        for block in self._section_blocks.values():
+            block.flush()
+        token_blocks = ("token_offsets", "token_heap", "token_starts", "posting_ids")
+        self._write_table(0, self._postings, token_blocks + tuple(f"posting_tf_{name}" for name in FIELDS))
+        self._write_table(1, self._gram_postings, ("gram_offsets", "gram_heap", "gram_starts", "gram_ids"))
+
+        paths = [self._path(name) for name in BLOCKS]
+        position = _HEADER.size + len(paths) * _BLOCK.size
+        table = []
+        for path in paths:
+            position += -position % 8
+            length = os.path.getsize(path)
+            table.append(_BLOCK.pack(position, length))
+            position += length
+
+        f.write(_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, digest, self._count))
+        f.write(b"".join(table))
+        position = _HEADER.size + len(table) * _BLOCK.size
+        for path in paths:
+            f.write(b"\0" * (-position % 8))
+            position += -position % 8
+            with open(path, 'rb') as block:
+                shutil.copyfileobj(block, f)
+            position += os.path.getsize(path)
+
+    def close(self):
+        """Remove the temporary files."""
+        for block in self._section_blocks.values():
+            block.close()
+        self._dir.cleanup()
+
+
+class _SortedStrings:
+    """Sorted UTF-8 strings stored as an offset block and a heap, searched by bisection."""
+
+    def __init__(self, offsets, heap):
+        self._offsets = offsets
+        self._heap = heap
+        self._count = len(offsets) - 1
+
+    def __len__(self):
+        return self._count
+
+    def key(self, position):
+        """Return the UTF-8 bytes of the string at a position."""
+        return bytes(self._heap[self._offsets[position]:self._offsets[position + 1]])
+
+    def bisect(self, key):
+        """Return the first position whose string is not less than key (UTF-8 bytes)."""
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def find(self, key):
+        """Return the position of key (UTF-8 bytes), or None if it is not in the table."""
+        position = self.bisect(key)
+        if position < self._count and self.key(position) == key:
+            return position
+        return None
+
+
+class _FieldTexts:
+    """Sequence of the lowercased field texts of every section, decoded from the index on access."""
+
+    def __init__(self, index):
+        self._index = index
+
+    def __len__(self):
+        return len(self._index)
+
+    def __getitem__(self, doc_id):
+        return self._index.section_fields(doc_id)
+
+    def __iter__(self):
+        return map(self._index.section_fields, range(len(self._index)))
+
+
+class ReferenceIndex:
+    """Read-only token and trigram postings of a reference, over the buffer of an index file.
+
+    path is the file the buffer maps, or None for an index held in memory.
+    """
+
+    def __init__(self, buffer, path=None):
+        magic, version, self.digest, self._count = _HEADER.unpack_from(buffer, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            raise ValueError(f"not a version {INDEX_VERSION} reference index")
+        self._buffer = buffer
+        self.path = path
+        view = memoryview(buffer)
+        blocks = {}
+        for block_no, name in enumerate(BLOCKS):
+            offset, length = _BLOCK.unpack_from(buffer, _HEADER.size + block_no * _BLOCK.size)
+            blocks[name] = view[offset:offset + length]
+
+        def typed(name, typecode):
+            block = blocks[name]
+            if _BYTE_ORDER_MATCHES:
+                return block.cast(typecode)
+            values = array(typecode, block.tobytes())
+            values.byteswap()
+            return values
+
+        # number of tokens in each section
+        self.doc_lengths = typed("doc_lengths", _U32)
+        self._tokens = _SortedStrings(typed("token_offsets", _U64), blocks["token_heap"])
+        self._token_starts = typed("token_starts", _U64)
+        self._posting_ids = typed("posting_ids", _U32)
+        self._posting_tfs = tuple(typed(f"posting_tf_{name}", _U32) for name in FIELDS)
+        self._grams = _SortedStrings(typed("gram_offsets", _U64), blocks["gram_heap"])
+        self._gram_starts = typed("gram_starts", _U64)
+        self._gram_ids = typed("gram_ids", _U32)
+        self._text_offsets = typed("text_offsets", _U64)
+        self._text_heap = blocks["text_heap"]
+        self._field_lengths = typed("field_lengths", _U32)
+        # lowercased field texts for every section id, in FIELDS order
+        self.field_texts = _FieldTexts(self)
+        self._avg_length = None
+
+    def __len__(self):
+        return self._count
+
+    def to_bytes(self):
+        """Return the bytes of the index file."""
+        return bytes(self._buffer)
+
+    def section_text(self, doc_id):
+        """Return the lowercased field texts of a section joined with spaces, the blob that is scored."""
+        return str(self._text_heap[self._text_offsets[doc_id]:self._text_offsets[doc_id + 1]], 'utf-8')
+
+    def field_lengths(self, doc_id):
+        """Return the length of each field text of a section, in FIELDS order."""
+        start = doc_id * len(FIELDS)
+        return tuple(self._field_lengths[start:start + len(FIELDS)])
+
+    def section_fields(self, doc_id):
+        """Return the lowercased field texts of a section, in FIELDS order."""
+        text = self.section_text(doc_id)
+        fields = []
+        start = 0
+        for length in self.field_lengths(doc_id):
+            fields.append(text[start:start + length])
+            start += length + 1
+        return tuple(fields)
+
+    def has_token(self, token):
+        """Return whether token occurs in some section."""
+        return self._tokens.find(token.encode('utf-8')) is not None
+
+    def token_postings(self, token):
+        """Return (section ids, per-field term frequencies) of a token, or None if it is unknown.
+
+        Both are sequences over the token's postings in section order; the
+        frequencies are one sequence per field, in FIELDS order.
+        """
+        position = self._tokens.find(token.encode('utf-8'))
+        if position is None:
+            return None
+        start, end = self._token_starts[position], self._token_starts[position + 1]
+        return self._posting_ids[start:end], tuple(tfs[start:end] for tfs in self._posting_tfs)
+
+    def gram_postings(self, gram):
+        """Return the ids of the sections holding a trigram, in order."""
+        position = self._grams.find(gram.encode('utf-8'))
+        if position is None:
+            return ()
+        return self._gram_ids[self._gram_starts[position]:self._gram_starts[position + 1]]
+
+    def prefix_postings(self, prefix):
+        """Return the ids of the sections holding a token that starts with prefix, in order.
+
+        Used for query words too short to have n-grams.
+        """
+        key = prefix.encode('utf-8')
+        tokens = self._tokens
+        found = set()
+        for position in range(tokens.bisect(key), len(tokens)):
+            if not tokens.key(position).startswith(key):
+                break
+            found.update(self._posting_ids[self._token_starts[position]:self._token_starts[position + 1]])
+        return sorted(found)
+
+    def _fragment_units(self, query_words):
+        """Return a posting list for every n-gram of the query and one per word too short for n-grams."""
+        units = []
+        grams = set()
+        for word in query_words:
+            if len(word) < NGRAM_SIZE:
+                units.append(self.prefix_postings(word))
+            else:
+                grams.update(query_ngrams(word))
+        for gram in grams:
+            units.append(self.gram_postings(gram))
+        return units
+
+    def candidates(self, query_words):
+        """Return the ids of sections sharing a token or n-gram with the query, in order."""
+        found = set()
+        for word in query_words:
+            postings = self.token_postings(word)
+            if postings is not None:
+                found.update(postings[0])
+        for ids in self._fragment_units(query_words):
+            found.update(ids)
+        return sorted(found)
+
+    def has_fragment(self, word):
+        """Return whether some section holds every n-gram of word, e.g. in a longer token."""
+        if len(word) < NGRAM_SIZE:
+            return bool(self.prefix_postings(word))
+        found = None
+        for gram in query_ngrams(word):
+            ids = self.gram_postings(gram)
+            if not ids:
+                return False
+            found = set(ids) if found is None else found.intersection(ids)
+            if not found:
+                return False
+        return found is not None
+
+    def rank_candidates(self, query_words, k):
+        """Return the ids of the k sections that best match the query, in order.
+
+        Sections are ranked by BM25F over the query words plus the fraction of
+        the query's n-grams (and of its words too short for n-grams, matched
+        as token prefixes) they contain, so sections that only match through
+        a misspelling can still make the cut. With k=None every candidate is
+        returned.
+        """
+        if k is None:
+            return self.candidates(query_words)
+
+        doc_lengths = self.doc_lengths
+        if self._avg_length is None:
+            self._avg_length = (sum(doc_lengths) / len(doc_lengths)) if len(doc_lengths) else 0.0
+        doc_count = len(doc_lengths)
+        scores = {}
+
+        for word in query_words:
+            postings = self.token_postings(word)
+            if postings is None:
+                continue
+            ids, tfs = postings
+            idf = math.log(1 + (doc_count - len(ids) + 0.5) / (len(ids) + 0.5))
+            for doc_id, counts in zip(ids, zip(*tfs)):
+                tf = sum(weight * count for weight, count in zip(BM25_FIELD_WEIGHTS, counts))
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_lengths[doc_id] / self._avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        units = self._fragment_units(query_words)
+        if units:
+            share = 1.0 / len(units)
+            for ids in units:
+                for doc_id in ids:
+                    scores[doc_id] = scores.get(doc_id, 0.0) + share
+
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return sorted(doc_id for doc_id, _ in best)
+
+
+def build_index(sections, spill_postings=SPILL_POSTINGS):
+    """Stream sections into an IndexBuilder, which the caller closes; section ids follow their order."""
+    builder = IndexBuilder(spill_postings)
+    try:
+        for section in sections:
+            builder.add_section(section)
+    except BaseException:
+        builder.close()
+        raise
+    return builder
+
+
+def source_digest(path):
+    """Return the SHA-256 digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def index_path_for(json_path):
+    """Return the path of the index file that belongs to a reference JSON file."""
+    return os.path.splitext(json_path)[0] + INDEX_SUFFIX
+
+
+def save_index(builder, path, digest):
+    """Write the index collected by an IndexBuilder to disk, tagged with the digest of its source JSON."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        builder.write(f, digest)
+    os.replace(tmp_path, path)
+
+
+def load_index(path, digest):
+    """Open an index file, memory-mapped.
+
+    Returns None if the file is missing, was written by another version of
+    the format, or was built from a different source JSON.
+    """
+    try:
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        index = ReferenceIndex(buffer, path)
+    except (OSError, ValueError, EOFError, TypeError, struct.error):
+        return None
+    if index.digest != digest:
+        return None
+    return index
+
+
+def load_or_build_index(json_path, sections, digest):
+    """Load the index saved next to json_path, rebuilding it from sections if it is stale."""
+    path = index_path_for(json_path)
+    index = load_index(path, digest)
+    if index is None:
+        with build_index(sections) as builder:
+            try:
+                save_index(builder, path, digest)
+            except OSError:
+                # A read-only install can still search, it just rebuilds each time
+                import io
+
+                f = io.BytesIO()
+                builder.write(f, digest)
+                return ReferenceIndex(f.getvalue())
+        index = load_index(path, digest)
+    return index
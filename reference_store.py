@@ -0,0 +1,190 @@
+"""
+Reference Store
+===============
+
+Compact on-disk copy of a reference that is opened with mmap instead of
+json.load. Records are only decoded when they are accessed, so a searcher
+never holds the whole reference as Python objects and several processes
+opening the same store share it through the page cache.
+
+File layout (little endian):
+
+    magic            6 bytes  b"PRSSTO"
+    version          2 bytes
+    source digest   32 bytes  SHA-256 of the JSON the store was built from
+    record count     4 bytes
+    offset table     count * (8 byte heap offset, 4 byte length)
+    string heap      one UTF-8 JSON object per record
+
+StoreWriter builds a store incrementally, so compiling a reference never
+needs all of its records in memory at once.
+"""
+
+import mmap
+import os
+import struct
+
+# json is imported by the functions that need it: opening a store and reading
+# its header should not pay for it.
+
+STORE_MAGIC = b"PRSSTO"
+STORE_VERSION = 1
+STORE_SUFFIX = ".store"
+_HEADER = struct.Struct("<6sH32sI")
+_ENTRY = struct.Struct("<QI")
+
+
+def store_path_for(json_path):
+    """Return the path of the store file that belongs to a JSON file."""
+    return os.path.splitext(json_path)[0] + STORE_SUFFIX
+
+
+def reference_records(reference):
+    """Flatten a compiled reference into one record per section, in category order."""
+    for category, sections in reference.get("categories", {}).items():
+        for section in sections:
+            record = {"category": category}
+            record.update(section)
+            yield record
+
+
+class StoreWriter:
+    """Writes a store one record at a time, keeping only the offset table in memory.
+
+    Record bodies are spooled to a temporary heap file; close() writes the
+    header and offset table and appends the heap, since the record count and
+    the source digest are only known at the end.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._heap_path = path + ".heap"
+        self._heap = open(self._heap_path, 'wb')
+        self._entries = []
+        self._offset = 0
+
+    def add(self, record):
+        """Append one record (a dictionary)."""
+        import json
+
+        blob = json.dumps(record, ensure_ascii=False).encode('utf-8')
+        self._heap.write(blob)
+        self._entries.append(_ENTRY.pack(self._offset, len(blob)))
+        self._offset += len(blob)
+
+    def close(self, digest):
+        """Finish the store file, tagged with the digest of its source."""
+        import shutil
+
+        self._heap.close()
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, 'wb') as f, open(self._heap_path, 'rb') as heap:
+                f.write(_HEADER.pack(STORE_MAGIC, STORE_VERSION, digest, len(self._entries)))
+                f.write(b"".join(self._entries))
+                shutil.copyfileobj(heap, f)
+            os.replace(tmp_path, self.path)
+        finally:
+            os.unlink(self._heap_path)
+
+
+def write_store(records, path, digest):
+    """Write records (dictionaries) to a store file tagged with digest."""
+    writer = StoreWriter(path)
+    for record in records:
+        writer.add(record)
+    writer.close(digest)
+
+
+class ReferenceStore:
+    """Read-only, memory-mapped sequence of reference records."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, self.digest, self._count = _HEADER.unpack_from(self._map, 0)
+        except struct.error:
+            self.close()
+            raise ValueError(f"{path} is not a reference store")
+        if magic != STORE_MAGIC or version != STORE_VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {STORE_VERSION} reference store")
+        self._heap_start = _HEADER.size + self._count * _ENTRY.size
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        """Decode record i."""
+        import json
+
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("reference store index out of range")
+        offset, length = _ENTRY.unpack_from(self._map, _HEADER.size + i * _ENTRY.size)
+        start = self._heap_start + offset
+        return json.loads(self._map[start:start + length].decode('utf-8'))
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self[i]
+
+    def close(self):
+        self._map.close()
+
+
+def open_store(path, digest):
+    """Open a store file, or return None if it is missing or was built from other data."""
+    try:
+        store = ReferenceStore(path)
+    except (OSError, ValueError):
+        return None
+    if store.digest != digest:
+        store.close()
+        return None
+    return store
+
+
+def iter_jsonl_records(path):
+    """Yield the records of a JSON Lines file one at a time."""
+    import json
+
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def load_records(json_path, digest, flatten=reference_records):
+    """Return the records of a JSON or JSON Lines file, memory-mapped whenever possible.
+
+    The store next to json_path is used if it matches digest; otherwise the
+    JSON is parsed once, flattened into records and written out as a fresh
+    store. A .jsonl file already holds one record per line and is streamed
+    into the store without being loaded as a whole. If the store cannot be
+    written the parsed records are returned as a plain list. Raises the
+    usual errors of open() and json.load().
+    """
+    path = store_path_for(json_path)
+    store = open_store(path, digest)
+    if store is not None:
+        return store
+
+    if json_path.endswith(".jsonl"):
+        try:
+            write_store(iter_jsonl_records(json_path), path, digest)
+        except OSError:
+            return list(iter_jsonl_records(json_path))
+        return open_store(path, digest) or list(iter_jsonl_records(json_path))
+
+    import json
+
+    with open(json_path, 'r', encoding='utf-8') as f:
+        records = list(flatten(json.load(f)))
+    try:
+        write_store(records, path, digest)
+    except OSError:
+        return records
+    return open_store(path, digest) or records
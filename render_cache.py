@@ -0,0 +1,190 @@
+"""
+Render Cache
+============
+
+Syntax-highlighted example code is the slowest part of showing a result
+after scoring: every block is lexed by Pygments and laid out by Rich each
+time it is displayed. RenderCache keeps the rendered segments of each block
+(text plus style, already wrapped to the terminal width), keyed by a hash
+of the code, the theme, the terminal width and the color system, so
+displaying it again only hands those segments back to the console. Entries
+are evicted least recently used first once the cache grows past its byte
+bound.
+
+compile_reference.py can pre-render every example into a cache file next to
+the compiled JSON (see save_render_cache); the search loads it on first use.
+Entries are keyed by content, so the file stays valid when the reference
+changes and only goes stale when Rich does.
+"""
+
+import hashlib
+import marshal
+import os
+import sys
+from collections import OrderedDict
+
+RENDER_MAGIC = b"PRSRND"
+RENDER_VERSION = 2
+RENDER_SUFFIX = ".render"
+DEFAULT_THEME = "monokai"
+# Memory bound of a cache, in bytes of rendered text
+DEFAULT_MAX_BYTES = 8 << 20
+
+
+def render_path_for(json_path):
+    """Return the path of the render cache file that belongs to a reference JSON file."""
+    return os.path.splitext(json_path)[0] + RENDER_SUFFIX
+
+
+def render_key(code, theme, width, color_system):
+    """Return the cache key of a code block rendered with a theme on a terminal."""
+    return (hashlib.sha256(code.encode('utf-8')).digest(), theme, width, color_system)
+
+
+def _cost(segments):
+    """Approximate memory held by a tuple of (text, style) segments."""
+    return sys.getsizeof(segments) + sum(sys.getsizeof(text) for text, _ in segments)
+
+
+class RenderCache:
+    """LRU cache of rendered code blocks, bounded by the total size of their segments.
+
+    An entry is a tuple of (text, style) pairs, the style given as a Rich
+    style string (or None), so entries can be marshalled to disk as is.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        # None keeps every entry (used when pre-rendering to disk)
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return the segments stored under key, or None on a miss."""
+        segments = self._entries.get(key)
+        if segments is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return segments
+
+    def put(self, key, segments):
+        """Store rendered segments, evicting the least recently used entries to stay in bounds."""
+        segments = tuple(segments)
+        cost = _cost(segments)
+        if self.max_bytes is not None and cost > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.size -= _cost(old)
+        self._entries[key] = segments
+        self.size += cost
+        while self.max_bytes is not None and self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= _cost(evicted)
+
+    def items(self):
+        """Return the (key, segments) pairs, least recently used first."""
+        return list(self._entries.items())
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def _rich_version():
+    from importlib.metadata import version
+    return version("rich")
+
+
+def save_render_cache(cache, path):
+    """Write a cache to disk, tagged with the Rich version that rendered it."""
+    payload = marshal.dumps((_rich_version(), cache.items()))
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(RENDER_MAGIC)
+        f.write(RENDER_VERSION.to_bytes(2, "little"))
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+
+def load_render_cache(path, max_bytes=DEFAULT_MAX_BYTES):
+    """Return a RenderCache holding the entries saved at path.
+
+    The cache is empty if the file is missing, has another format version or
+    was rendered by another version of Rich.
+    """
+    cache = RenderCache(max_bytes)
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(len(RENDER_MAGIC) + 2)
+            if (header[:len(RENDER_MAGIC)] != RENDER_MAGIC
+                    or int.from_bytes(header[len(RENDER_MAGIC):], "little") != RENDER_VERSION):
+                return cache
+            rich_version, entries = marshal.loads(f.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return cache
+    if rich_version != _rich_version():
+        return cache
+    for key, segments in entries:
+        cache.put(key, segments)
+    return cache
+
+
+def render_code(console, code, theme=DEFAULT_THEME):
+    """Render a block of Python code for a console and return its (text, style) segments.
+
+    Only lays the block out with the console's options: nothing is printed,
+    so a capture or buffer the caller has open on the console is untouched.
+    """
+    # Loads Pygments on the first highlighted block
+    from rich.syntax import Syntax
+
+    syntax = Syntax(
+        code,
+        "python",
+        theme=theme,
+        line_numbers=True,
+        word_wrap=True
+    )
+    return tuple(
+        (segment.text, None if segment.style is None else str(segment.style))
+        for segment in console.render(syntax, console.options)
+    )
+
+
+def print_code(console, code, cache, theme=DEFAULT_THEME):
+    """Print a syntax-highlighted block of Python code, rendering it only on a cache miss.
+
+    The segments go through console.print, so capturing, recording and
+    paging on the console work as they do for any other output.
+    """
+    from rich.segment import Segment, Segments
+    from rich.style import Style
+
+    key = render_key(code, theme, console.width, console.color_system)
+    segments = cache.get(key)
+    if segments is None:
+        segments = render_code(console, code, theme)
+        cache.put(key, segments)
+    # Style.parse is memoized, so each distinct style string is parsed once
+    console.print(Segments(
+        Segment(text, None if style is None else Style.parse(style))
+        for text, style in segments
+    ), end="")
+
+
+def prerender(cache, blocks, widths, color_systems=("truecolor",), theme=DEFAULT_THEME):
+    """Render code blocks for every combination of terminal width and color system into cache."""
+    import io
+    from rich.console import Console
+
+    for width in widths:
+        for color_system in color_systems:
+            console = Console(file=io.StringIO(), width=width, color_system=color_system, force_terminal=True)
+            for code in blocks:
+                key = render_key(code, theme, width, console.color_system)
+                if cache.get(key) is None:
+                    cache.put(key, render_code(console, code, theme))
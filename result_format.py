@@ -0,0 +1,66 @@
+"""
+Machine-Readable Result Output
+==============================
+
+Formats search results as JSON, JSON Lines or TSV for use in pipelines.
+The whole output is built in memory and written with a single call, so
+nothing goes through Rich and thousands of results cost one write.
+
+In TSV nested dictionaries become dotted columns (scores.title, ...), lists
+are joined with newlines, and tabs, newlines and backslashes inside values
+are escaped as \\t, \\n and \\\\.
+"""
+
+import json
+import sys
+
+FORMATS = ("json", "jsonl", "tsv")
+
+_TSV_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _flatten(record, prefix=""):
+    flat = {}
+    for key, value in record.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        else:
+            flat[prefix + key] = value
+    return flat
+
+
+def _tsv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, (list, tuple)):
+        value = "\n".join(str(item) for item in value)
+    return str(value).translate(_TSV_ESCAPES)
+
+
+def format_results(records, fmt, columns=None):
+    """Return result records (dictionaries) formatted as fmt, one of FORMATS.
+
+    columns selects and orders the TSV columns; by default they are those
+    of the first record.
+    """
+    if fmt == "json":
+        return json.dumps(records, indent=2, ensure_ascii=False) + "\n"
+    if fmt == "jsonl":
+        return "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+    if fmt == "tsv":
+        rows = [_flatten(record) for record in records]
+        if columns is None:
+            columns = list(rows[0]) if rows else []
+        lines = ["\t".join(columns)]
+        for row in rows:
+            lines.append("\t".join(_tsv_value(row.get(column)) for column in columns))
+        return "\n".join(lines) + "\n"
+    raise ValueError(f"Unknown output format {fmt!r}, expected one of {FORMATS}")
+
+
+def write_results(records, fmt, stream=None, columns=None):
+    """Write result records to stream (stdout by default) in one buffered write."""
+    if stream is None:
+        stream = sys.stdout
+    stream.write(format_results(records, fmt, columns))
+    stream.flush()
@@ -0,0 +1,155 @@
+"""
+Reference Search Scoring
+========================
+
+Per-section scoring used by PythonReferenceSearch. The functions are kept at
+module level so that worker processes (see parallel_search.py) can score
+sections without importing the interactive application.
+"""
+
+import heapq
+from bisect import bisect_left
+
+# Sections scoring at or below this are never returned
+SCORE_THRESHOLD = 20
+
+# Most the two fuzzy metrics (each 0-100) can add to a section's score
+MAX_FUZZY_SCORE = 100 * 0.4 + 100 * 0.3
+
+# Names of the per-metric scores, in the order they are kept in results
+METRICS = ("title", "content", "keywords", "word_match")
+
+
+def prepare_query(query):
+    """Lowercase and tokenize a query once for all the sections it is scored against."""
+    query_lower = query.lower()
+    return query_lower, set(query_lower.split())
+
+
+class SectionRecord:
+    """Text of one section as it is scored, so scoring never lowercases or joins.
+
+    title and blob are lowercased (the index already lowercases the field
+    texts); blob is every field joined with spaces.
+    """
+
+    __slots__ = ("title", "blob")
+
+    def __init__(self, title, blob):
+        self.title = title
+        self.blob = blob
+
+
+def section_record(index, doc_id):
+    """Return the SectionRecord of a section, decoded from a ReferenceIndex."""
+    blob = index.section_text(doc_id)
+    return SectionRecord(blob[:index.field_lengths(doc_id)[0]], blob)
+
+
+def query_token_ids(index, query_words):
+    """Return the sorted ids of the sections holding each query word as a token.
+
+    Words that no section holds are left out, as they match nothing.
+    """
+    word_ids = []
+    for word in query_words:
+        postings = index.token_postings(word)
+        if postings is not None:
+            word_ids.append(postings[0])
+    return word_ids
+
+
+def keyword_score(text, query, keyword_weights):
+    """Calculate score based on keyword matches."""
+    score = 0
+    text_lower = text.lower()
+    query_words = query.lower().split()
+
+    for word in query_words:
+        if word in keyword_weights:
+            if word in text_lower:
+                score += keyword_weights[word]
+
+    return score
+
+
+def top_sections(prepared, sections, keyword_weights, top_n, advance=None, cheap_metrics=None, word_ids=()):
+    """Score (section id, SectionRecord) pairs and keep the best top_n.
+
+    The cheap keyword and word-overlap metrics are computed first (or taken
+    from cheap_metrics, a pair of per-section sequences such as the arrays
+    of vector_scoring.VectorScorer). Word overlap counts the sequences of
+    word_ids (see query_token_ids) that hold the section. The fuzzy scorers
+    only run when they could still lift a section into the current top_n. Returns (score,
+    section id, metric tuple) triples, best first, with ties kept in
+    section order.
+    """
+    if top_n <= 0:
+        return []
+
+    # Imported here so that loading this module stays cheap
+    from fuzzywuzzy import fuzz
+
+    query_lower, query_words = prepared
+    # Query words that carry a keyword weight, repeats included, in the order
+    # keyword_score adds them up
+    weighted = [(word, keyword_weights[word]) for word in query_lower.split() if word in keyword_weights]
+    word_count = len(query_words)
+    # Min-heap of (score, -section id, section id, metrics)
+    heap = []
+
+    for doc_id, record in sections:
+        if advance:
+            advance(1)
+
+        if cheap_metrics is None:
+            # Same as keyword_score(record.blob, query_lower, keyword_weights)
+            blob = record.blob
+            keywords = 0
+            for word, weight in weighted:
+                if word in blob:
+                    keywords += weight
+            # Calculate word match score
+            shared = 0
+            for ids in word_ids:
+                position = bisect_left(ids, doc_id)
+                if position < len(ids) and ids[position] == doc_id:
+                    shared += 1
+            word_match_score = shared / word_count * 100
+        else:
+            keywords = float(cheap_metrics[0][doc_id])
+            word_match_score = float(cheap_metrics[1][doc_id])
+        partial = (
+            keywords * 20 +  # Keyword importance
+            word_match_score * 0.3  # Word overlap
+        )
+
+        # Skip the fuzzy scorers when even perfect fuzzy matches could not win
+        floor = heap[0][0] if len(heap) == top_n else SCORE_THRESHOLD
+        if partial + MAX_FUZZY_SCORE + 1e-9 <= floor:
+            continue
+
+        title_score = fuzz.ratio(query_lower, record.title)
+        content_score = fuzz.partial_ratio(query_lower, record.blob)
+        # Weighted combination of scores
+        score = (
+            title_score * 0.4 +  # Title matches are important
+            content_score * 0.3 +  # Content relevance
+            partial
+        )
+        if score <= SCORE_THRESHOLD:
+            continue
+
+        entry = (score, -doc_id, doc_id, (title_score, content_score, keywords, word_match_score))
+        if len(heap) < top_n:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+
+    heap.sort(reverse=True)
+    return [(score, doc_id, metrics) for score, _, doc_id, metrics in heap]
+
+
+def metric_dict(metrics):
+    """Return the per-metric scores of a result as a dictionary."""
+    return dict(zip(METRICS, metrics))
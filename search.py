@@ -1,22 +1,89 @@
-import json
-from fuzzywuzzy import fuzz
-from rich.console import Console
-from rich.table import Table
-from rich.panel import Panel
-from rich.syntax import Syntax
-from rich.text import Text
-from rich import box
-from rich.prompt import Prompt
-from rich.progress import Progress
+import importlib
 import os
-import re
-from collections import defaultdict
+import sys
+from reference_index import load_or_build_index, source_digest
+from reference_store import load_records
+from query_cache import QueryCache, normalize_query
+from scoring import METRICS, keyword_score, metric_dict, prepare_query, query_token_ids, section_record, top_sections
+
+# Rich (and Pygments through rich.syntax), fuzzywuzzy, NumPy, the process
+# pool and even json are imported where they are first used so that the
+# interactive prompt comes up before any of them has loaded.
+
+# Modules the interactive session imports in the background while the user
+# types the first query. rich.syntax is left out: Pygments is only loaded
+# once a result is actually rendered.
+WARM_UP_MODULES = ("fuzzywuzzy.fuzz", "rich.console", "rich.panel", "rich.table")
+
+# Number of sections the cheap first stage hands to the fuzzy scorers
+DEFAULT_CANDIDATE_K = 100
+
+# Implementations of the keyword and word-overlap metrics
+BACKENDS = ("python", "numpy")
+
+# Fewest sections a search must score before the interactive session shows a progress bar
+PROGRESS_MIN_SECTIONS = 2000
+
+class RichProgressReporter:
+    """Progress callback for search() and search_many() that draws a Rich progress bar.
+
+    The bar (and the refresh thread behind it) is only started once a search
+    reports at least min_total units of work, so quick searches never pay
+    for it. Call close() when the search is done.
+    """
+
+    def __init__(self, console, min_total=PROGRESS_MIN_SECTIONS, description="[cyan]Searching..."):
+        self.console = console
+        self.min_total = min_total
+        self.description = description
+        self._progress = None
+        self._task = None
+
+    def __call__(self, advanced, total):
+        if self._progress is None:
+            if total < self.min_total:
+                return
+            from rich.progress import Progress
+            self._progress = Progress(console=self.console)
+            self._progress.start()
+            self._task = self._progress.add_task(self.description, total=total)
+        self._progress.update(self._task, advance=advanced)
+
+    def close(self):
+        if self._progress is not None:
+            self._progress.stop()
+            self._progress = None
 
 class PythonReferenceSearch:
-    def __init__(self, json_path):
-        self.console = Console()
+    def __init__(self, json_path, candidate_k=DEFAULT_CANDIDATE_K, workers=None,
+                 cache_size=256, cache_ttl=300.0, backend="python", correct_typos=True,
+                 render_cache_bytes=8 << 20):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown scoring backend {backend!r}, expected one of {BACKENDS}")
+        if backend == "numpy":
+            from vector_scoring import numpy_available
+            if not numpy_available():
+                raise ImportError("backend='numpy' requires numpy to be installed")
+        self._console = None
         self.json_path = json_path
-        self.reference = self._load_reference()
+        # None disables the first stage and fuzzy-scores every candidate
+        self.candidate_k = candidate_k
+        # More than one worker shards scoring across processes
+        self.workers = workers
+        self._parallel = None
+        self.backend = backend
+        self._vector = None
+        # Also search for the closest known term of query words missing from the reference
+        self.correct_typos = correct_typos
+        self._typo_index = None
+        # Results of recent queries; cache_size=0 disables caching
+        self.cache = QueryCache(cache_size, cache_ttl) if cache_size else None
+        # Rendered code blocks, loaded from the pre-rendered file on first display
+        self.render_cache_bytes = render_cache_bytes
+        self._render_cache = None
+        self.digest = None
+        self._source_stat = None
+        self._open_reference()
         self.keyword_weights = {
             'list': 1.5,
             'string': 1.5,
@@ -33,147 +100,269 @@ class PythonReferenceSearch:
             'syntax': 1.2
         }
         
+    @property
+    def console(self):
+        """Rich console for output, created on first use."""
+        if self._console is None:
+            from rich.console import Console
+            self._console = Console()
+        return self._console
+
+    @console.setter
+    def console(self, console):
+        self._console = console
+
+    def _open_reference(self):
+        """Load the reference sections and their search index."""
+        self.reference = self._load_reference()
+        self.index = load_or_build_index(self.json_path, self.reference, self.digest) if self.reference else None
+        self._vector = None
+        self._typo_index = None
+        # Compiled code blocks of the examples returned so far, by example digest
+        self._example_blocks = {}
+
+    def _stat_source(self):
+        """Return the modification time and size of the JSON file, or None if it is missing."""
+        try:
+            stat = os.stat(self.json_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _refresh_if_changed(self):
+        """Reload the reference and drop cached results when the JSON file has changed."""
+        current = self._stat_source()
+        if current == self._source_stat:
+            return
+        if current is not None and source_digest(self.json_path) == self.digest:
+            # Touched but not modified
+            self._source_stat = current
+            return
+
+        self.close()
+        if hasattr(self.reference, "close"):
+            self.reference.close()
+        self._open_reference()
+        if self.cache is not None:
+            self.cache.clear()
+
+    def _cache_key(self, query, top_n):
+        """Return the cache key of a query under the current scoring configuration."""
+        return (
+            normalize_query(query),
+            top_n,
+            self.candidate_k,
+            tuple(sorted(self.keyword_weights.items())),
+            self.correct_typos
+        )
+
+    def _cached_matches(self, key):
+        """Return a copy of the matches cached under key, or None on a miss.
+
+        Callers get their own dictionaries, so changing a result never
+        changes what later searches return.
+        """
+        matches = self.cache.get(key)
+        if matches is None:
+            return None
+        from copy import deepcopy
+        return deepcopy(matches)
+
+    def _cache_matches(self, key, matches):
+        """Cache a copy of matches under key, keeping the caller's list its own."""
+        from copy import deepcopy
+        self.cache.put(key, deepcopy(matches))
+
     def _load_reference(self):
-        """Load the reference JSON file."""
+        """Open the reference sections, memory-mapped from the store next to the JSON file."""
         try:
-            with open(self.json_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            self._source_stat = self._stat_source()
+            self.digest = source_digest(self.json_path)
+            return load_records(self.json_path, self.digest)
         except FileNotFoundError:
             self.console.print("[red]Error: Reference file not found![/]")
             return None
-        except json.JSONDecodeError:
+        except ValueError:  # json.JSONDecodeError
             self.console.print("[red]Error: Invalid JSON file![/]")
             return None
 
     def _calculate_keyword_score(self, text, query):
         """Calculate score based on keyword matches."""
-        score = 0
-        text_lower = text.lower()
-        query_words = query.lower().split()
-        
-        for word in query_words:
-            if word in self.keyword_weights:
-                if word in text_lower:
-                    score += self.keyword_weights[word]
-                    
-        return score
+        return keyword_score(text, query, self.keyword_weights)
 
     def _extract_code_blocks(self, text):
         """Extract code blocks from text for syntax highlighting."""
-        if not text:
-            return []
-            
-        # Split the text into lines
-        lines = text.split('\n')
-        code_blocks = []
-        current_block = []
-        in_block = False
-        
-        for line in lines:
-            # Check if line contains code (starts with # or contains = or other code indicators)
-            is_code_line = (
-                line.strip().startswith('#') or
-                '=' in line or
-                '(' in line or
-                '[' in line or
-                ']' in line or
-                ':' in line or
-                'def ' in line or
-                'class ' in line or
-                'import ' in line or
-                'from ' in line or
-                'return ' in line or
-                'print(' in line or
-                'if ' in line or
-                'for ' in line or
-                'while ' in line
-            )
-            
-            if is_code_line:
-                if not in_block and current_block:
-                    code_blocks.append('\n'.join(current_block))
-                    current_block = []
-                in_block = True
-                current_block.append(line)
-            elif in_block and line.strip():
-                current_block.append(line)
-            elif in_block and not line.strip():
-                if current_block:
-                    code_blocks.append('\n'.join(current_block))
-                    current_block = []
-                in_block = False
-                
-        if current_block:
-            code_blocks.append('\n'.join(current_block))
-            
-        # If no code blocks were found, treat the entire text as a code block
-        if not code_blocks and text.strip():
-            code_blocks = [text]
-            
-        return code_blocks
+        from code_blocks import segment_code_blocks
+        return segment_code_blocks(text)
+
+    def _example_code_blocks(self, match):
+        """Return the code blocks of each example of a match, compiled or extracted."""
+        from code_blocks import example_code_blocks
+        return example_code_blocks(match["examples"], self._example_blocks)
+
+    def _correct_query(self, prepared):
+        """Return a prepared query with the corrections of misspelled words added to its words.
+
+        Only words that appear nowhere in the reference, not even inside a
+        longer token, are looked up in the trigram index (built on first
+        use). Corrections are added next to the word as typed rather than
+        replacing it, and the query text the fuzzy scorers compare stays as
+        the user wrote it.
+        """
+        if not self.correct_typos:
+            return prepared
+        from typo_index import build_typo_index, is_term
+
+        query_lower, query_words = prepared
+        index = self.index
+        unknown = [
+            word for word in query_words
+            if not index.has_token(word) and is_term(word) and not index.has_fragment(word)
+        ]
+        if not unknown:
+            return prepared
+
+        if self._typo_index is None:
+            self._typo_index = build_typo_index(index.field_texts)
+        corrections = set()
+        for word in unknown:
+            correction = self._typo_index.correct(word)
+            if correction is not None:
+                corrections.add(correction)
+        if not corrections:
+            return prepared
+        return query_lower, query_words | corrections
+
+    def _score_candidates(self, prepared, candidates, text_for, top_n, advance=None):
+        """Score candidate sections against a prepared query.
 
-    def search(self, query, top_n=3):
-        """Enhanced search with better matching algorithms."""
+        Returns the best top_n (score, section id, metric tuple) triples, best
+        first.
+        """
+        if self.workers and self.workers > 1:
+            if self._parallel is None or self._parallel.keyword_weights != self.keyword_weights:
+                from parallel_search import ParallelScorer
+                self.close()
+                self._parallel = ParallelScorer(self.index, self.keyword_weights, self.workers)
+            return self._parallel.score(prepared, candidates, top_n, advance)
+
+        cheap_metrics = None
+        word_ids = ()
+        if self.backend == "numpy" and prepared[1]:
+            if self._vector is None or self._vector.keyword_weights != self.keyword_weights:
+                from vector_scoring import VectorScorer
+                self._vector = VectorScorer(self.index, self.keyword_weights)
+            cheap_metrics = self._vector.cheap_metrics(prepared)
+        else:
+            word_ids = query_token_ids(self.index, prepared[1])
+
+        sections = ((doc_id, text_for(doc_id)) for doc_id in candidates)
+        return top_sections(prepared, sections, self.keyword_weights, top_n, advance, cheap_metrics, word_ids)
+
+    def _section_text(self, doc_id):
+        """Return a section's SectionRecord (lowercased title and text blob), read from the index."""
+        return section_record(self.index, doc_id)
+
+    def _build_matches(self, results, top_n):
+        """Build result dictionaries for the best top_n scored sections."""
+        # Only the sections that are returned get decoded from the store
+        matches = []
+        for score, doc_id, metrics in results[:top_n]:
+            section = self.reference[doc_id]
+            match = {
+                "category": section["category"],
+                "title": section.get("title", ""),
+                "purpose": section.get("purpose", ""),
+                "syntax": section.get("syntax", ""),
+                "examples": section.get("examples", []),
+                "score": score,
+                "scores": metric_dict(metrics)
+            }
+            # Code blocks segmented at compile time, if the reference has
+            # them, are kept aside for display rather than put in the match
+            if "example_blocks" in section:
+                from code_blocks import blocks_by_digest
+                self._example_blocks.update(blocks_by_digest(section["example_blocks"]))
+            matches.append(match)
+        return matches
+
+    def search(self, query, top_n=3, progress=None):
+        """Enhanced search with better matching algorithms.
+
+        progress, if given, is called as progress(advanced, total) while the
+        candidate sections are scored, e.g. a RichProgressReporter.
+        """
+        self._refresh_if_changed()
         if not self.reference:
             return []
 
-        results = []
-        query_words = set(query.lower().split())
+        if self.cache is not None:
+            key = self._cache_key(query, top_n)
+            cached = self._cached_matches(key)
+            if cached is not None:
+                return cached
+
+        # Scored in the same normalized form the cache key uses, so a cached
+        # result is exactly what a fresh search would return
+        prepared = self._correct_query(prepare_query(normalize_query(query)))
+        # Cheap index ranking picks the sections worth running the fuzzy scorers on
+        candidates = self.index.rank_candidates(prepared[1], self.candidate_k)
         
-        with Progress() as progress:
-            task = progress.add_task("[cyan]Searching...", total=len(self.reference.get("categories", {})))
-            
-            for category, sections in self.reference.get("categories", {}).items():
-                for section in sections:
-                    # Combine all searchable fields
-                    text_blob = " ".join([
-                        section.get("title", ""),
-                        section.get("purpose", ""),
-                        section.get("syntax", ""),
-                        " ".join(section.get("examples", []))
-                    ])
-                    
-                    # Calculate various scores
-                    title_score = fuzz.ratio(query.lower(), section.get("title", "").lower())
-                    content_score = fuzz.partial_ratio(query.lower(), text_blob.lower())
-                    keyword_score = self._calculate_keyword_score(text_blob, query)
-                    
-                    # Calculate word match score
-                    section_words = set(text_blob.lower().split())
-                    word_match_score = len(query_words & section_words) / len(query_words) * 100
-                    
-                    # Weighted combination of scores
-                    score = (
-                        title_score * 0.4 +  # Title matches are important
-                        content_score * 0.3 +  # Content relevance
-                        keyword_score * 20 +  # Keyword importance
-                        word_match_score * 0.3  # Word overlap
-                    )
-                    
-                    if score > 20:  # Lower threshold for more results
-                        results.append({
-                            "category": category,
-                            "title": section.get("title", ""),
-                            "purpose": section.get("purpose", ""),
-                            "syntax": section.get("syntax", ""),
-                            "examples": section.get("examples", []),
-                            "score": score,
-                            "scores": {
-                                "title": title_score,
-                                "content": content_score,
-                                "keywords": keyword_score,
-                                "word_match": word_match_score
-                            }
-                        })
-                
-                progress.update(task, advance=1)
+        advance = None
+        if progress is not None:
+            total = len(candidates)
+            advance = lambda count: progress(count, total)
+        results = self._score_candidates(prepared, candidates, self._section_text, top_n, advance)
+
+        matches = self._build_matches(results, top_n)
+        if self.cache is not None:
+            self._cache_matches(key, matches)
+        return matches
 
-        # Sort by score, descending
-        results.sort(key=lambda x: x["score"], reverse=True)
-        return results[:top_n]
+    def search_many(self, queries, top_n=3, progress=None):
+        """Search a batch of queries without any terminal output.
+
+        All queries are tokenized up front. Yields (query, matches)
+        pairs in the order the queries were given. progress, if given, is
+        called as progress(1, number of queries) after each query.
+        """
+        queries = list(queries)
+        self._refresh_if_changed()
+        if not self.reference:
+            for query in queries:
+                yield query, []
+            return
+
+        prepared_queries = [self._correct_query(prepare_query(normalize_query(query))) for query in queries]
+
+        for query, prepared in zip(queries, prepared_queries):
+            matches = None
+            if self.cache is not None:
+                key = self._cache_key(query, top_n)
+                matches = self._cached_matches(key)
+
+            if matches is None:
+                candidates = self.index.rank_candidates(prepared[1], self.candidate_k)
+                results = self._score_candidates(prepared, candidates, self._section_text, top_n)
+                matches = self._build_matches(results, top_n)
+                if self.cache is not None:
+                    self._cache_matches(key, matches)
+            if progress is not None:
+                progress(1, len(queries))
+            yield query, matches
+
+    def close(self):
+        """Shut down the worker processes used for parallel scoring, if any."""
+        if self._parallel is not None:
+            self._parallel.close()
+            self._parallel = None
 
     def display_results(self, matches, query):
         """Display search results with enhanced formatting."""
+        from rich import box
+        from rich.panel import Panel
+        from rich.table import Table
+
         if not matches:
             self.console.print(Panel(
                 "No matches found. Try a different query.",
@@ -228,9 +417,11 @@ class PythonReferenceSearch:
                     border_style="yellow"
                 ))
                 
-                for ex in match["examples"]:
+                # Compiled blocks are reused only where they match the example text
+                all_blocks = self._example_code_blocks(match)
+                for ex_no, ex in enumerate(match["examples"]):
                     # First try to extract and display code blocks
-                    code_blocks = self._extract_code_blocks(ex)
+                    code_blocks = all_blocks[ex_no]
                     
                     if code_blocks:
                         for block in code_blocks:
@@ -238,13 +429,7 @@ class PythonReferenceSearch:
                             cleaned_block = block.strip()
                             if cleaned_block:
                                 try:
-                                    self.console.print(Syntax(
-                                        cleaned_block,
-                                        "python",
-                                        theme="monokai",
-                                        line_numbers=True,
-                                        word_wrap=True
-                                    ))
+                                    self._print_code(cleaned_block)
                                 except Exception:
                                     # If syntax highlighting fails, display as regular text
                                     self.console.print(Panel(
@@ -265,17 +450,71 @@ class PythonReferenceSearch:
             
             self.console.print("\n" + "="*100 + "\n")
 
+    def _print_code(self, code):
+        """Print a syntax-highlighted code block, reusing its rendered output when cached."""
+        from render_cache import load_render_cache, print_code, render_path_for
+
+        if self._render_cache is None:
+            self._render_cache = load_render_cache(render_path_for(self.json_path), self.render_cache_bytes)
+        print_code(self.console, code, self._render_cache)
+
+    def _warm_up(self):
+        """Import what the first search and display need in a background thread."""
+        import threading
+
+        def load():
+            for name in WARM_UP_MODULES:
+                try:
+                    importlib.import_module(name)
+                except ImportError:
+                    pass
+
+        threading.Thread(target=load, name="warm-up", daemon=True).start()
+
+    def _print_welcome(self):
+        """Draw the welcome panel without Rich so it shows before Rich has loaded."""
+        try:
+            columns = os.get_terminal_size(sys.stdout.fileno()).columns
+        except (OSError, ValueError):
+            columns = 80
+        inner = max(columns - 2, 50)
+        title = " Welcome "
+        left = (inner - len(title)) // 2
+        lines = [
+            _ansi("Python Reference Search", "1", "35"),
+            _ansi("Enter your search query (or 'quit' to exit)", "3")
+        ]
+        widths = [len("Python Reference Search"), len("Enter your search query (or 'quit' to exit)")]
+
+        out = [_ansi("╭" + "─" * left + title + "─" * (inner - left - len(title)) + "╮", "35")]
+        for line, width in zip(lines, widths):
+            out.append(_ansi("│", "35") + " " + line + " " * (inner - 1 - width) + _ansi("│", "35"))
+        out.append(_ansi("╰" + "─" * inner + "╯", "35"))
+        if sys.stdout.isatty():
+            # Same as console.clear()
+            sys.stdout.write("\033[2J\033[H")
+        sys.stdout.write("\n".join(out) + "\n")
+        sys.stdout.flush()
+
     def run(self):
         """Run the interactive search interface."""
-        self.console.clear()
-        self.console.print(Panel(
-            "[bold magenta]Python Reference Search[/]\n[italic]Enter your search query (or 'quit' to exit)[/]",
-            title="Welcome",
-            border_style="magenta"
-        ))
+        self._print_welcome()
+        # Rich and fuzzywuzzy load while the user types the first query
+        warm_up = self._warm_up
         
         while True:
-            query = Prompt.ask("\n[bold green]Enter your search query[/]")
+            prompt = "\n" + _ansi("Enter your search query", "1", "32") + ": "
+            if warm_up:
+                # Show the first prompt before the warm-up competes for the GIL
+                sys.stdout.write(prompt)
+                sys.stdout.flush()
+                prompt = ""
+                warm_up()
+                warm_up = None
+            try:
+                query = input(prompt)
+            except EOFError:
+                query = 'quit'
             
             if query.lower() == 'quit':
                 self.console.print("[yellow]Goodbye![/]")
@@ -285,19 +524,105 @@ class PythonReferenceSearch:
                 self.console.print("[red]Please enter a valid search query[/]")
                 continue
                 
+            # Only searches big enough to take a noticeable time draw a progress bar
+            progress = RichProgressReporter(self.console)
             try:
-                matches = self.search(query)
+                matches = self.search(query, progress=progress)
+                progress.close()
                 self.display_results(matches, query)
             except Exception as e:
+                progress.close()
                 self.console.print(f"[red]Error: {str(e)}[/]")
 
-def main():
+def _ansi(text, *codes):
+    """Wrap text in ANSI style codes when stdout is a terminal."""
+    if not sys.stdout.isatty():
+        return text
+    return f"\033[{';'.join(codes)}m{text}\033[0m"
+
+def _result_records(results):
+    """Flatten (query, matches) pairs into the records written by --format."""
+    records = []
+    for query, matches in results:
+        for rank, match in enumerate(matches, 1):
+            records.append({
+                "query": query,
+                "rank": rank,
+                "score": match["score"],
+                "category": match["category"],
+                "title": match["title"],
+                "purpose": match["purpose"],
+                "syntax": match["syntax"],
+                "examples": match["examples"],
+                "scores": match["scores"]
+            })
+    return records
+
+# TSV columns of --format tsv
+RESULT_COLUMNS = (
+    ["query", "rank", "score", "category", "title", "purpose", "syntax", "examples"]
+    + [f"scores.{metric}" for metric in METRICS]
+)
+
+def main(argv=None):
     # Get the directory of the current script
     current_dir = os.path.dirname(os.path.abspath(__file__))
     json_path = os.path.join(current_dir, "new_reference", "python_reference.json")
     
-    search_app = PythonReferenceSearch(json_path)
-    search_app.run()
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        search_app = PythonReferenceSearch(json_path)
+        search_app.run()
+        return 0
+
+    # Only loaded when there are arguments, so the interactive prompt stays fast
+    import argparse
+    from result_format import FORMATS, write_results
+
+    parser = argparse.ArgumentParser(description="Search the Python reference.")
+    parser.add_argument("queries", nargs="*", help="Queries to search; interactive mode when none are given")
+    parser.add_argument("--format", choices=FORMATS,
+                        help="Write the results as json, jsonl or tsv instead of Rich tables")
+    parser.add_argument("--top-n", type=int, default=3, help="Number of results per query")
+    parser.add_argument("--queries-from", metavar="FILE",
+                        help="Also search each line of FILE ('-' for standard input)")
+    parser.add_argument("--json", default=json_path, help="Reference JSON file")
+    args = parser.parse_args(argv)
+
+    queries = list(args.queries)
+    if args.queries_from:
+        if args.queries_from == "-":
+            lines = sys.stdin.read().splitlines()
+        else:
+            with open(args.queries_from, 'r', encoding='utf-8') as f:
+                lines = f.read().splitlines()
+        queries.extend(line for line in lines if line.strip())
+
+    search_app = PythonReferenceSearch(args.json)
+    try:
+        # A batch (even an empty one) never falls into the interactive prompt
+        if not queries and not args.format and not args.queries_from:
+            search_app.run()
+        elif not search_app.reference:
+            return 1
+        elif args.format:
+            # Long batches report progress on stderr, keeping stdout clean
+            progress = None
+            if sys.stderr.isatty():
+                from rich.console import Console
+                progress = RichProgressReporter(Console(stderr=True), min_total=1000, description="[cyan]Queries...")
+            try:
+                results = list(search_app.search_many(queries, args.top_n, progress))
+            finally:
+                if progress is not None:
+                    progress.close()
+            write_results(_result_records(results), args.format, columns=RESULT_COLUMNS)
+        else:
+            for query in queries:
+                search_app.display_results(search_app.search(query, args.top_n), query)
+    finally:
+        search_app.close()
+    return 0
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    sys.exit(main()) 
\ No newline at end of file
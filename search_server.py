@@ -0,0 +1,187 @@
+"""
+Python Reference Search Server
+==============================
+
+Keeps a PythonReferenceSearch loaded and answers search requests over a Unix
+socket (or a localhost TCP port), so editor integrations can query the
+reference without paying for a cold process every time.
+
+The protocol is one JSON object per line in each direction:
+
+    request:  {"query": "list comprehension", "top_n": 3}
+    response: {"results": [...]}            or {"error": "..."}
+
+Run the server:
+
+    python search_server.py serve
+    python search_server.py serve --port 8765
+
+Query it:
+
+    python search_server.py query "list comprehension"
+
+The client side only uses the standard library and does not import the
+search application, so it starts in a few milliseconds.
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+import tempfile
+
+DEFAULT_SOCKET_PATH = os.path.join(tempfile.gettempdir(), "python_reference_search.sock")
+DEFAULT_JSON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "new_reference", "python_reference.json")
+
+
+def _handle_request(search_app, line):
+    """Answer one request line with a response dictionary."""
+    try:
+        request = json.loads(line)
+        query = request["query"]
+        top_n = int(request.get("top_n", 3))
+    except (ValueError, KeyError, TypeError, OverflowError):
+        return {"error": "Expected a JSON object with a 'query' field and an integer 'top_n'"}
+    if not isinstance(query, str) or not query.strip():
+        return {"error": "Please enter a valid search query"}
+
+    try:
+        # search_many never touches the terminal, unlike search()
+        _, matches = next(search_app.search_many([query], top_n))
+    except Exception as e:
+        return {"error": f"Search failed: {e}"}
+    return {"results": matches}
+
+
+async def _serve_client(search_app, executor, reader, writer):
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            # Searching off the event loop keeps other clients' connections
+            # served while a slow query runs
+            try:
+                response = await loop.run_in_executor(executor, _handle_request, search_app, line)
+            except Exception as e:
+                response = {"error": f"Search failed: {e}"}
+            writer.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b"\n")
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(json_path=DEFAULT_JSON_PATH, socket_path=DEFAULT_SOCKET_PATH, port=None, ready=None):
+    """Load the reference once and answer requests until cancelled.
+
+    Listens on localhost:port if a port is given, otherwise on socket_path.
+    ready, if given, is called once the server is accepting connections.
+    """
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+    from search import PythonReferenceSearch
+
+    search_app = PythonReferenceSearch(json_path)
+    if not search_app.reference:
+        raise SystemExit(1)
+    # One search thread: PythonReferenceSearch builds its caches lazily and
+    # is not meant to run two searches at once
+    executor = ThreadPoolExecutor(max_workers=1)
+
+    async def handler(reader, writer):
+        await _serve_client(search_app, executor, reader, writer)
+
+    if port is not None:
+        server = await asyncio.start_server(handler, "127.0.0.1", port)
+    else:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = await asyncio.start_unix_server(handler, socket_path)
+
+    try:
+        async with server:
+            if ready:
+                ready()
+            await server.serve_forever()
+    finally:
+        executor.shutdown(wait=True)
+        search_app.close()
+        if port is None and os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def query_server(query, top_n=3, socket_path=DEFAULT_SOCKET_PATH, port=None, timeout=5.0):
+    """Send one query to a running server and return its list of matches.
+
+    Raises ConnectionError if no server is listening or it closes the
+    connection without answering, and RuntimeError if the server rejects
+    the request or its response is not valid JSON.
+    """
+    if port is not None:
+        sock = socket.create_connection(("127.0.0.1", port), timeout=timeout)
+    else:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        try:
+            sock.connect(socket_path)
+        except (FileNotFoundError, ConnectionRefusedError) as e:
+            sock.close()
+            raise ConnectionError(f"No search server listening on {socket_path}") from e
+
+    with sock, sock.makefile('rwb') as stream:
+        stream.write(json.dumps({"query": query, "top_n": top_n}).encode('utf-8') + b"\n")
+        stream.flush()
+        line = stream.readline()
+    if not line:
+        raise ConnectionError("The search server closed the connection without a response")
+    try:
+        response = json.loads(line)
+    except ValueError as e:
+        raise RuntimeError(f"Invalid response from the search server: {e}") from e
+
+    if "error" in response:
+        raise RuntimeError(response["error"])
+    return response["results"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Warm Python reference search server and client.")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help="Unix socket path")
+    parser.add_argument("--port", type=int, help="Use localhost TCP on this port instead of a Unix socket")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="Load the reference and answer queries")
+    serve_parser.add_argument("--json", default=DEFAULT_JSON_PATH, help="Reference JSON file")
+
+    query_parser = commands.add_parser("query", help="Send a query to a running server")
+    query_parser.add_argument("query", help="Search query")
+    query_parser.add_argument("--top-n", type=int, default=3, help="Number of results")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        import asyncio
+        try:
+            asyncio.run(serve(args.json, args.socket, args.port))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    try:
+        results = query_server(args.query, args.top_n, args.socket, args.port)
+    except (ConnectionError, OSError, RuntimeError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    json.dump(results, sys.stdout, indent=2, ensure_ascii=False)
+    sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""
+Incremental Search Session
+==========================
+
+As-you-type search on top of a PythonReferenceSearch, for live-filtering
+interfaces that search again on every keystroke.
+
+A section matches a partial query when every word of the query occurs in
+its text; the last word is usually still being typed, so words are matched
+as fragments rather than whole tokens. Appending characters to a query can
+only shrink that set, so each keystroke filters the sections that matched
+the previous query instead of the whole reference, and deleting characters
+goes back to the set remembered for the shorter query. The sections left
+are then ranked with the usual scorers. When no section holds every word
+(natural-language queries, typos) the session falls back to the
+candidates PythonReferenceSearch.search would score, typo corrections
+included, so it never comes up empty where search() finds results.
+
+Calling update() again, or cancel(), from another thread stops a search
+that is still running; the interrupted update() returns None.
+
+    session = SearchSession(search_app)
+    for query in ("l", "li", "lis", "list", "list c", "list co"):
+        matches = session.update(query)
+"""
+
+import threading
+
+from query_cache import normalize_query
+from reference_index import NGRAM_SIZE, query_ngrams
+from scoring import prepare_query
+
+# Sections filtered between two checks for cancellation
+_CANCEL_CHECK_INTERVAL = 64
+
+
+class SearchCancelled(Exception):
+    """Raised inside a session search that a newer keystroke has replaced."""
+
+
+class SearchSession:
+    """Incremental search over one PythonReferenceSearch, refined keystroke by keystroke."""
+
+    def __init__(self, search_app, top_n=3):
+        self.search_app = search_app
+        self.top_n = top_n
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._reset()
+
+    def _reset(self):
+        """Forget every remembered query, e.g. after the reference was reloaded."""
+        self._index = self.search_app.index
+        # (lowercased query, ids of the sections matching it) for the chain of
+        # prefixes typed so far; None stands for every section
+        self._history = [("", None)]
+
+    def cancel(self):
+        """Stop the search in progress, if any."""
+        with self._lock:
+            self._generation += 1
+
+    def _check(self, generation):
+        if generation != self._generation:
+            raise SearchCancelled()
+
+    def _index_matches(self, words, generation):
+        """Return the ids of the sections containing every word, found through the n-gram postings.
+
+        Words too short for n-grams narrow the search through token prefixes
+        only when the query has no longer word; the result then misses
+        sections holding such a word inside a token (see _candidates).
+        """
+        found = None
+        long_words = [word for word in words if len(word) >= NGRAM_SIZE]
+        for word in long_words:
+            for gram in query_ngrams(word):
+                ids = set(self._index.gram_postings(gram))
+                found = ids if found is None else found & ids
+                if not found:
+                    return []
+        if not long_words:
+            for word in words:
+                ids = set(self._index.prefix_postings(word))
+                found = ids if found is None else found & ids
+                if not found:
+                    return []
+        return self._filter(sorted(found), words, generation)
+
+    def _filter(self, candidates, words, generation):
+        """Return the candidates whose text contains every word, in order."""
+        matches = []
+        for count, doc_id in enumerate(candidates):
+            if count % _CANCEL_CHECK_INTERVAL == 0:
+                self._check(generation)
+            blob = self._index.section_text(doc_id)
+            if all(word in blob for word in words):
+                matches.append(doc_id)
+        return matches
+
+    def _candidates(self, query_lower, words, generation):
+        """Return the sections matching a query, refining those of its longest remembered prefix."""
+        with self._lock:
+            while not query_lower.startswith(self._history[-1][0]):
+                self._history.pop()
+            previous_query, previous = self._history[-1]
+        if previous_query == query_lower:
+            return previous
+
+        if previous is None:
+            candidates = self._index_matches(words, generation)
+        else:
+            candidates = self._filter(previous, words, generation)
+        with self._lock:
+            self._check(generation)
+            # Prefix matches are not every section holding the words, so
+            # longer queries must not be refined from them
+            if any(len(word) >= NGRAM_SIZE for word in words):
+                self._history.append((query_lower, candidates))
+        return candidates
+
+    def update(self, query):
+        """Search for the query as typed so far.
+
+        Returns the best top_n matches (the dictionaries of
+        PythonReferenceSearch.search), or None if the search was cancelled
+        by a newer update() or by cancel().
+        """
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+
+        search_app = self.search_app
+        search_app._refresh_if_changed()
+        if not search_app.reference:
+            return []
+        if search_app.index is not self._index:
+            self._reset()
+
+        # Same normalized form as PythonReferenceSearch.search
+        prepared = prepare_query(normalize_query(query))
+        query_lower, words = prepared
+        if not words:
+            return []
+
+        def advance(count):
+            self._check(generation)
+
+        try:
+            candidates = self._candidates(query_lower, words, generation)
+            if not candidates:
+                prepared = search_app._correct_query(prepared)
+                candidates = search_app.index.rank_candidates(prepared[1], search_app.candidate_k)
+            results = search_app._score_candidates(
+                prepared, candidates, search_app._section_text, self.top_n, advance
+            )
+        except SearchCancelled:
+            return None
+        return search_app._build_matches(results, self.top_n)
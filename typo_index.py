@@ -0,0 +1,149 @@
+"""
+Typo Correction Index
+=====================
+
+Character-trigram index over the vocabulary of a reference: the words of
+section titles, syntax strings and the identifiers used in examples. A
+misspelled query word is looked up by the trigrams it shares with each term
+and the closest terms are then verified with a real edit distance, so
+correcting a word only touches the few terms that look like it instead of
+the whole vocabulary.
+
+    index = build_typo_index(reference_index.field_texts)
+    index.correct("dictonary")   # -> "dictionary"
+"""
+
+import re
+
+from reference_index import FIELDS
+
+# Fields whose words make up the vocabulary, as positions in FIELDS
+VOCABULARY_FIELDS = tuple(FIELDS.index(name) for name in ("title", "syntax", "examples"))
+
+# Identifiers and plain words; shorter ones are too ambiguous to correct to
+_TERM = re.compile(r"[a-z_][a-z0-9_]{2,}")
+
+# Least Dice coefficient of shared trigrams for a term to be verified
+MIN_TRIGRAM_SIMILARITY = 0.4
+
+
+def is_term(word):
+    """Return whether a (lowercased) word has the shape of a vocabulary term."""
+    return _TERM.fullmatch(word) is not None
+
+
+def term_trigrams(term):
+    """Return the set of trigrams of a term padded with one boundary mark on each side."""
+    padded = f"${term}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def max_edits(word):
+    """Return the largest edit distance at which a term is accepted as a correction of word."""
+    # Two edits to a five-letter word leave little of it (array -> arr)
+    if len(word) <= 5:
+        return 1
+    if len(word) <= 8:
+        return 2
+    return 3
+
+
+class TrigramIndex:
+    """Trigram postings over a vocabulary, with memoized corrections."""
+
+    def __init__(self, terms=()):
+        # term id -> term, and term -> number of sections it appears in
+        self.terms = []
+        self.frequencies = {}
+        # trigram -> [term id, ...]
+        self.postings = {}
+        self._gram_counts = []
+        self._corrections = {}
+        for term in terms:
+            self.add_term(term)
+
+    def add_term(self, term, frequency=1):
+        """Add a term to the vocabulary, or raise the frequency of a known one."""
+        if term in self.frequencies:
+            self.frequencies[term] += frequency
+            return
+        term_id = len(self.terms)
+        self.terms.append(term)
+        self.frequencies[term] = frequency
+        grams = term_trigrams(term)
+        self._gram_counts.append(len(grams))
+        for gram in grams:
+            self.postings.setdefault(gram, []).append(term_id)
+        self._corrections.clear()
+
+    def __contains__(self, term):
+        return term in self.frequencies
+
+    def __len__(self):
+        return len(self.terms)
+
+    def similar_terms(self, word):
+        """Return the terms sharing enough trigrams with word, most similar first."""
+        grams = term_trigrams(word)
+        shared = {}
+        for gram in grams:
+            for term_id in self.postings.get(gram, ()):
+                shared[term_id] = shared.get(term_id, 0) + 1
+
+        similar = []
+        for term_id, count in shared.items():
+            dice = 2 * count / (len(grams) + self._gram_counts[term_id])
+            if dice >= MIN_TRIGRAM_SIMILARITY:
+                similar.append((dice, self.terms[term_id]))
+        similar.sort(key=lambda item: (-item[0], item[1]))
+        return [term for _, term in similar]
+
+    def correct(self, word):
+        """Return the vocabulary term closest to word, or None if nothing is close enough.
+
+        A word already in the vocabulary is its own correction. Among terms
+        within max_edits(word) edits the nearest wins, then the most
+        frequent, then the alphabetically first.
+        """
+        if word in self.frequencies:
+            return word
+        if word in self._corrections:
+            return self._corrections[word]
+
+        # Imported here so that loading this module stays cheap
+        from Levenshtein import distance
+
+        limit = max_edits(word)
+        best = None
+        for term in self.similar_terms(word):
+            if abs(len(term) - len(word)) > limit:
+                continue
+            edits = distance(word, term)
+            if edits > limit:
+                continue
+            key = (edits, -self.frequencies[term], term)
+            if best is None or key < best:
+                best = key
+        correction = best[2] if best is not None else None
+        self._corrections[word] = correction
+        return correction
+
+
+def vocabulary(field_texts):
+    """Count the sections each vocabulary term appears in, given lowercased field texts."""
+    counts = {}
+    for texts in field_texts:
+        terms = set()
+        for field_no in VOCABULARY_FIELDS:
+            terms.update(_TERM.findall(texts[field_no]))
+        for term in terms:
+            counts[term] = counts.get(term, 0) + 1
+    return counts
+
+
+def build_typo_index(field_texts):
+    """Build a TrigramIndex over the vocabulary of lowercased section field texts."""
+    index = TrigramIndex()
+    for term, frequency in sorted(vocabulary(field_texts).items()):
+        index.add_term(term, frequency)
+    return index
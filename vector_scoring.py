@@ -0,0 +1,74 @@
+"""
+Vectorized Reference Scoring
+============================
+
+Optional NumPy backend for the cheap part of scoring. Sections are held as a
+sparse term matrix (one array of section ids per token, built from the index
+postings on first use) plus a bitset of which keyword-weighted words occur in
+each section, so the keyword and word-overlap metrics of every section are
+computed with a handful of array operations per query.
+
+NumPy is not a hard dependency; use numpy_available() before enabling it.
+"""
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def numpy_available():
+    """Return True if the NumPy backend can be used."""
+    return np is not None
+
+
+class VectorScorer:
+    """Keyword and word-overlap scores for every section of an index at once."""
+
+    def __init__(self, index, keyword_weights):
+        if np is None:
+            raise ImportError("the numpy scoring backend requires numpy to be installed")
+        self.index = index
+        self.section_count = len(index)
+        self.keyword_weights = dict(keyword_weights)
+        self._keywords = list(self.keyword_weights)
+        self._keyword_column = {word: column for column, word in enumerate(self._keywords)}
+
+        # Bitset of keyword occurrences: row per keyword, column per section
+        blobs = map(index.section_text, range(self.section_count))
+        present = np.array(
+            [[word in blob for word in self._keywords] for blob in blobs], dtype=bool
+        ).reshape(self.section_count, len(self._keywords)).T
+        self._keyword_bits = np.packbits(present, axis=1)
+        # Token -> array of section ids, filled lazily from the postings
+        self._term_columns = {}
+
+    def _keyword_row(self, word):
+        bits = np.unpackbits(self._keyword_bits[self._keyword_column[word]], count=self.section_count)
+        return bits.astype(bool)
+
+    def _term_column(self, word):
+        column = self._term_columns.get(word)
+        if column is None:
+            postings = self.index.token_postings(word)
+            ids = postings[0] if postings is not None else ()
+            column = np.array(ids, dtype=np.int64)
+            self._term_columns[word] = column
+        return column
+
+    def cheap_metrics(self, prepared):
+        """Return (keyword scores, word match scores) arrays indexed by section id."""
+        query_lower, query_words = prepared
+
+        keywords = np.zeros(self.section_count)
+        # Same order of additions as scoring.keyword_score, so scores match exactly
+        for word in query_lower.split():
+            if word in self.keyword_weights:
+                keywords[self._keyword_row(word)] += self.keyword_weights[word]
+
+        overlap = np.zeros(self.section_count)
+        for word in query_words:
+            overlap[self._term_column(word)] += 1
+        word_match = overlap / len(query_words) * 100 if query_words else overlap
+
+        return keywords, word_match